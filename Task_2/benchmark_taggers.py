@@ -0,0 +1,216 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from pos_metrics import encode_tagged, tagging_report
+from treebank_cache import TREEBANK_CACHE_DIR, decode_tokens, load_treebank_cache
+
+
+TAGGERS = ("spacy", "stanford_nltk", "stanford_server")
+# Sentence-length buckets, in tokens (inclusive bounds, None for no upper bound)
+LENGTH_BUCKETS = ((1, 10), (11, 25), (26, 50), (51, None))
+BENCHMARK_OUTPUT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "benchmark_taggers.json"
+)
+
+
+def _peak_rss_mb(who: int) -> float:
+    """Peak resident set size of this process (or of its terminated children), in MB."""
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def _make_tagger(tagger: str, model: str) -> tuple[Callable, Callable[[], None]]:
+    """Tagging function of a benchmarked path, and the function that releases it."""
+    if tagger == "spacy":
+        from pos_spacy import spacy_pos
+
+        return lambda batch: spacy_pos(batch, model=model), lambda: None
+
+    from standford_pos_nltk import stanford_pos
+
+    if tagger == "stanford_nltk":
+        return stanford_pos, lambda: None
+    if tagger == "stanford_server":
+        from stanford_server import StanfordTaggerServer
+
+        server = StanfordTaggerServer().start()
+        client = server.client()
+        return lambda batch: stanford_pos(batch, server=client), server.stop
+    raise ValueError(f"Unknown tagger: {tagger}, expected one of {TAGGERS}")
+
+
+def _run_cell(
+    tagger: str,
+    sentence_ids: np.ndarray,
+    batch_size: int,
+    model: str,
+    cache_dir: str,
+) -> dict:
+    """Tag the given gold sentences in batches, in a fresh process, and measure it."""
+    gold, tag_index = load_treebank_cache(cache_dir, sentences=sentence_ids, check=False)
+    tokens = decode_tokens(gold)
+    batches = [tokens[i : i + batch_size] for i in range(0, len(tokens), batch_size)]
+
+    # Loading the model (and starting the JVM for the server) is timed separately
+    start = time.perf_counter()
+    tag, release = _make_tagger(tagger, model)
+    tag(batches[0][:1])
+    startup = time.perf_counter() - start
+
+    try:
+        latencies = []
+        output = []
+        for batch in batches:
+            start = time.perf_counter()
+            output.extend(tag(batch))
+            latencies.append(time.perf_counter() - start)
+    finally:
+        release()
+
+    report = tagging_report(encode_tagged(output, tag_index), gold, tag_index)
+    n_tokens = len(gold.words)
+    return {
+        "sentences": len(tokens),
+        "tokens": n_tokens,
+        "batches": len(batches),
+        "startup_seconds": startup,
+        "total_seconds": sum(latencies),
+        "tokens_per_second": n_tokens / sum(latencies),
+        "p50_batch_seconds": float(np.percentile(latencies, 50)),
+        "p95_batch_seconds": float(np.percentile(latencies, 95)),
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        # The JVMs of the Stanford paths, once they have exited
+        "peak_child_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "accuracy": report["accuracy"],
+        "misaligned_sentences": len(report["misaligned_sentences"]),
+    }
+
+
+def benchmark_taggers(
+    taggers: Iterable[str] = TAGGERS,
+    batch_sizes: Iterable[int] = (1, 32, 256),
+    length_buckets: Iterable[tuple[int, Optional[int]]] = LENGTH_BUCKETS,
+    max_sentences: int = 512,
+    max_batches: int = 20,
+    model: str = "en_core_web_sm",
+    seed: int = 42,
+    cache_dir: str = TREEBANK_CACHE_DIR,
+    output_path: Optional[str] = BENCHMARK_OUTPUT,
+) -> pd.DataFrame:
+    """Throughput, latency, memory and accuracy of the POS taggers on the treebank.
+
+    Trace-free gold sentences are sampled from each length bucket, and every tagger
+    tags the same sample in batches of each size, timing each batch. Each cell runs
+    in its own process, so the peak RSS is the one of that cell alone and the model
+    load of one cell does not warm up the next one.
+
+    Parameters
+    ----------
+    taggers : Iterable[str], optional
+        Paths to benchmark among "spacy" (``spacy_pos``), "stanford_nltk"
+        (``stanford_pos``, one JVM per batch) and "stanford_server" (``stanford_pos``
+        through a ``StanfordTaggerServer``), by default all of them
+    batch_sizes : Iterable[int], optional
+        Numbers of sentences per tagging call, by default (1, 32, 256)
+    length_buckets : Iterable[tuple[int, Optional[int]]], optional
+        Inclusive (min, max) sentence lengths in tokens, by default LENGTH_BUCKETS
+    max_sentences : int, optional
+        Sentences sampled from each bucket, by default 512
+    max_batches : int, optional
+        Maximum number of batches per cell, so that small batch sizes on the
+        Stanford NLTK path stay tractable, by default 20
+    model : str, optional
+        The spaCy model to use, by default "en_core_web_sm"
+    seed : int, optional
+        Seed of the sentence sampling, by default 42
+    cache_dir : str, optional
+        Directory of the treebank cache, by default Task_2/data/treebank_cache
+    output_path : Optional[str], optional
+        JSON file where the results are written, by default
+        Task_2/data/benchmark_taggers.json; None to skip writing
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per cell with tokens/sec, p50/p95 batch latency, peak RSS and accuracy.
+    """
+    taggers, batch_sizes = tuple(taggers), tuple(batch_sizes)
+    gold, _ = load_treebank_cache(cache_dir)
+    lengths = np.diff(gold.offsets)
+    rng = np.random.default_rng(seed)
+
+    rows = []
+    for low, high in length_buckets:
+        in_bucket = np.flatnonzero((lengths >= low) & (lengths <= (high or lengths.max())))
+        bucket = f"{low}-{high}" if high is not None else f"{low}+"
+        if len(in_bucket) == 0:
+            print(f"No gold sentence of {bucket} tokens, skipping the bucket")
+            continue
+        sample = rng.permutation(in_bucket)[:max_sentences]
+
+        for batch_size in batch_sizes:
+            sentence_ids = sample[: batch_size * max_batches]
+            for tagger in taggers:
+                print(f"Benchmarking {tagger} on {bucket} tokens, batches of {batch_size}...")
+                # A fresh process per cell isolates its peak RSS and its warm-up
+                with ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    result = executor.submit(
+                        _run_cell, tagger, sentence_ids, batch_size, model, cache_dir
+                    ).result()
+                rows.append(
+                    {"tagger": tagger, "length_bucket": bucket, "batch_size": batch_size, **result}
+                )
+
+    results = pd.DataFrame(rows)
+    if output_path is not None:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(
+                {
+                    "environment": {
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "cpu_count": os.cpu_count(),
+                        "spacy_model": model,
+                        "seed": seed,
+                        "max_sentences": max_sentences,
+                        "max_batches": max_batches,
+                    },
+                    "results": rows,
+                },
+                f,
+                indent=2,
+            )
+        print(f"Benchmark results written to {output_path}")
+    return results
+
+
+if __name__ == "__main__":
+    results = benchmark_taggers()
+    print(
+        results[
+            [
+                "tagger",
+                "length_bucket",
+                "batch_size",
+                "tokens_per_second",
+                "p50_batch_seconds",
+                "p95_batch_seconds",
+                "peak_rss_mb",
+                "peak_child_rss_mb",
+                "accuracy",
+            ]
+        ].to_string(index=False)
+    )
@@ -0,0 +1,170 @@
+import warnings
+from itertools import chain
+from typing import Optional, TypedDict
+
+import numpy as np
+import pandas as pd
+from treebank_cache import EncodedTags
+
+
+class TaggingReport(TypedDict):
+    accuracy: float
+    n_tokens: int
+    tags: list[str]
+    confusion: np.ndarray
+    per_tag: pd.DataFrame
+    mismatch_indices: np.ndarray
+    misaligned_sentences: np.ndarray
+
+
+def encode_tagged(tagged_sents, tag_index: dict[str, int]) -> EncodedTags:
+    """Convert tagged sentences to flat arrays, once, for repeated comparisons.
+
+    Parameters
+    ----------
+    tagged_sents : list[list[tuple[str, str]]]
+        A list of sentences, where each sentence is a list of tuples (word, tag)
+    tag_index : dict[str, int]
+        Id of each tag, shared by all the outputs that are compared. Tags that are not
+        in it yet are added.
+
+    Returns
+    -------
+    EncodedTags
+        The words, tag ids and sentence offsets.
+    """
+    lengths = np.fromiter(map(len, tagged_sents), dtype=np.int64, count=len(tagged_sents))
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    tokens = list(chain.from_iterable(tagged_sents))
+    words = np.array([word for word, _ in tokens], dtype=object)
+    tag_codes, tags = pd.factorize(np.array([tag for _, tag in tokens], dtype=object))
+    for tag in tags:
+        tag_index.setdefault(tag, len(tag_index))
+    tag_ids = np.array([tag_index[tag] for tag in tags], dtype=np.int64)[tag_codes]
+
+    return EncodedTags(words, tag_ids, offsets)
+
+
+def align_tokens(
+    encoded_1: EncodedTags, encoded_2: EncodedTags
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Token positions compared between two outputs, and the misaligned sentences.
+
+    As ``zip`` does, the first min(n1, n2) tokens of the first min(s1, s2) sentences are
+    compared; sentences whose lengths or words differ are reported as misaligned, and so
+    are the sentences that only one of the outputs has.
+    """
+    n_sents_1, n_sents_2 = len(encoded_1.offsets) - 1, len(encoded_2.offsets) - 1
+    n_sents = min(n_sents_1, n_sents_2)
+    starts_1, starts_2 = encoded_1.offsets[:n_sents], encoded_2.offsets[:n_sents]
+    lengths_1 = np.diff(encoded_1.offsets[: n_sents + 1])
+    lengths_2 = np.diff(encoded_2.offsets[: n_sents + 1])
+    lengths = np.minimum(lengths_1, lengths_2)
+
+    # Position of each compared token within its sentence, then in each flat array
+    within = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    positions_1 = np.repeat(starts_1, lengths) + within
+    positions_2 = np.repeat(starts_2, lengths) + within
+
+    word_differs = encoded_1.words[positions_1] != encoded_2.words[positions_2]
+    sentence_ids = np.repeat(np.arange(n_sents), lengths)
+    misaligned = np.union1d(
+        np.flatnonzero(lengths_1 != lengths_2), np.unique(sentence_ids[word_differs])
+    )
+    misaligned = np.concatenate((misaligned, np.arange(n_sents, max(n_sents_1, n_sents_2))))
+    return positions_1, positions_2, misaligned
+
+
+def unmatched_gold_tokens(
+    encoded: EncodedTags, gold: EncodedTags, gold_positions: np.ndarray
+) -> np.ndarray:
+    """Positions of the gold tokens that no token of a tagger output is aligned with.
+
+    These are the tokens cut from the sentences the output shortened, and those of the
+    sentences it is missing; both count as errors. A warning reports them, and another
+    one the extra sentences of the output, which are ignored.
+    """
+    unmatched = np.ones(len(gold.tag_ids), dtype=bool)
+    unmatched[gold_positions] = False
+    unmatched = np.flatnonzero(unmatched)
+    if len(unmatched) > 0:
+        warnings.warn(
+            f"{len(unmatched)} gold tokens have no token in the tagger output; "
+            "they count as errors",
+            stacklevel=2,
+        )
+
+    n_sents, n_gold_sents = len(encoded.offsets) - 1, len(gold.offsets) - 1
+    if n_sents > n_gold_sents:
+        warnings.warn(
+            f"The tagger returned {n_sents} sentences for {n_gold_sents} gold sentences; "
+            "the extra ones are ignored",
+            stacklevel=2,
+        )
+    return unmatched
+
+
+def tagging_report(
+    pos_tag_output,
+    gold,
+    tag_index: Optional[dict[str, int]] = None,
+) -> TaggingReport:
+    """Accuracy, confusion matrix and per-tag precision/recall of a tagger, in one pass.
+
+    Parameters
+    ----------
+    pos_tag_output : Union[list[list[tuple[str, str]]], EncodedTags]
+        The tagger output, or its ``encode_tagged`` arrays
+    gold : Union[list[list[tuple[str, str]]], EncodedTags]
+        The gold standard, or its ``encode_tagged`` arrays
+    tag_index : Optional[dict[str, int]], optional
+        Tag ids used to encode the arguments, required if they are already encoded,
+        by default None
+
+    Returns
+    -------
+    TaggingReport
+        The accuracy and number of scored gold tokens; the confusion matrix (gold tags in
+        rows, predicted tags in columns, in the order of ``tags``); the precision,
+        recall and support of each tag; the positions (in the flat gold arrays) of the
+        mismatched tokens, and the sentences whose tokens do not match the gold ones.
+        The gold tokens that no output token is aligned with (those of the sentences
+        the output shortened or is missing) count as errors.
+    """
+    tag_index = {} if tag_index is None else tag_index
+    if not isinstance(pos_tag_output, EncodedTags):
+        pos_tag_output = encode_tagged(pos_tag_output, tag_index)
+    if not isinstance(gold, EncodedTags):
+        gold = encode_tagged(gold, tag_index)
+
+    positions, gold_positions, misaligned = align_tokens(pos_tag_output, gold)
+    unmatched = unmatched_gold_tokens(pos_tag_output, gold, gold_positions)
+    predicted_ids = pos_tag_output.tag_ids[positions]
+    gold_ids = gold.tag_ids[gold_positions]
+
+    n_tags = len(tag_index)
+    confusion = np.bincount(gold_ids * n_tags + predicted_ids, minlength=n_tags * n_tags)
+    confusion = confusion.reshape(n_tags, n_tags)
+
+    correct = np.diag(confusion)
+    support = confusion.sum(axis=1) + np.bincount(gold.tag_ids[unmatched], minlength=n_tags)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = correct / confusion.sum(axis=0)
+        recall = correct / support
+    tags = sorted(tag_index, key=tag_index.__getitem__)
+
+    n_tokens = len(gold_ids) + len(unmatched)
+    return {
+        "accuracy": float(correct.sum() / n_tokens) if n_tokens > 0 else 0.0,
+        "n_tokens": n_tokens,
+        "tags": tags,
+        "confusion": confusion,
+        "per_tag": pd.DataFrame(
+            {"precision": precision, "recall": recall, "support": support},
+            index=pd.Index(tags, name="tag"),
+        ),
+        "mismatch_indices": np.sort(
+            np.concatenate((gold_positions[predicted_ids != gold_ids], unmatched))
+        ),
+        "misaligned_sentences": misaligned,
+    }
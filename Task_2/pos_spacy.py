@@ -1,54 +1,57 @@
 # spacy_pos.py
 from typing import Literal
 
-import spacy
 from spacy.tokens import Doc
 
-
-# If not installed: python -m spacy download en_core_web_sm
-nlp = spacy.load("en_core_web_sm")  # 3.x/4.x
+from text_mining.spacy_models import TAGGER_COMPONENTS, load_spacy_model
 
 
 def spacy_pos(
-    tokenized_text: list[list[str]], tagging: Literal["PTB", "UPOS"] = "PTB"
+    tokenized_text: list[list[str]],
+    tagging: Literal["PTB", "UPOS"] = "PTB",
+    model: str = "en_core_web_sm",
+    batch_size: int = 1000,
+    n_process: int = 1,
 ) -> list[list[tuple[str, str]]]:
     """
     Returns per sentence: [(token, UPOS=token.pos_, PTB=token.tag_), ...]
     Uses pos_ for Universal POS; uses tag_ for Penn Treebank (comparable to Stanford).
 
+    All sentences are built as pre-tokenized Docs and streamed through the pipeline with
+    ``nlp.pipe``, so every component processes them in batches.
+
     Args:
         tokenized_text: List of sentences, each as a list of tokens
         tagging: Either "PTB" for Penn Treebank tags or "UPOS" for Universal POS tags
+        model: spaCy model to use (if not installed: python -m spacy download en_core_web_sm)
+        batch_size: Number of sentences per batch of the pipeline components
+        n_process: Number of processes to tag with (-1 uses all cores)
     """
+    if tagging not in ("PTB", "UPOS"):
+        raise ValueError(f"Unknown tagging type: {tagging}. Must be 'PTB' or 'UPOS'.")
+
+    # Loaded once per process, with only tok2vec + tagger (+ attribute_ruler for UPOS)
+    nlp = load_spacy_model(model, TAGGER_COMPONENTS)
+
+    # Create spaCy Docs from pre-tokenized text to avoid re-tokenization
+    # This ensures we use exactly the same tokens as NLTK/Stanford
+    docs = (
+        Doc(
+            nlp.vocab,
+            words=sentence_tokens,
+            # Assume spaces between all tokens, no space after the last one
+            spaces=[True] * (len(sentence_tokens) - 1) + [False] if sentence_tokens else [],
+        )
+        for sentence_tokens in tokenized_text
+    )
+
+    # nlp.pipe skips the tokenizer for Doc inputs
     results = []
-
-    for sentence_tokens in tokenized_text:
-        # Create a spaCy Doc from pre-tokenized text to avoid re-tokenization
-        # This ensures we use exactly the same tokens as NLTK/Stanford
-        spaces = [True] * len(sentence_tokens)  # Assume spaces between all tokens
-        if len(spaces) > 0:
-            spaces[-1] = False  # No space after last token
-
-        doc = Doc(nlp.vocab, words=sentence_tokens, spaces=spaces)
-
-        # Process the doc through the pipeline (but skip tokenizer since we already have tokens)
-        for pipe_name, pipe_component in nlp.pipeline:
-            if pipe_name != "tokenizer":  # Skip tokenizer
-                doc = pipe_component(doc)
-
-        # Extract tags for each token
-        sentence_tags = []
-        for i, token in enumerate(doc):
-            if tagging == "PTB":
-                tag = token.tag_
-            elif tagging == "UPOS":
-                tag = token.pos_
-            else:
-                raise ValueError(f"Unknown tagging type: {tagging}. Must be 'PTB' or 'UPOS'.")
-
-            sentence_tags.append((sentence_tokens[i], tag))
-
-        results.append(sentence_tags)
+    for sentence_tokens, doc in zip(
+        tokenized_text, nlp.pipe(docs, batch_size=batch_size, n_process=n_process)
+    ):
+        tags = [token.tag_ for token in doc] if tagging == "PTB" else [token.pos_ for token in doc]
+        results.append(list(zip(sentence_tokens, tags)))
 
     return results
 
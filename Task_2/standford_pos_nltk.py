@@ -1,9 +1,9 @@
 # stanford_pos_nltk.py
-import nltk
+from typing import Optional
 
+import nltk
+from stanford_server import STANFORD_JAR, STANFORD_MODEL, StanfordTaggerClient
 
-# Basic downloads (one time only)
-nltk.download("punkt_tab")
 
 # Compatibility with different NLTK versions
 try:
@@ -11,14 +11,8 @@ try:
 except Exception:
     from nltk.tag.stanford import StanfordPOSTagger  # fallback for old NLTK versions
 
-# 1) Paths to YOUR files:
-STANFORD_JAR = (
-    "stanford-postagger-full-2020-11-17/stanford-postagger-4.2.0.jar"  # or 'stanford-postagger.jar'
-)
-STANFORD_MODEL = "stanford-postagger-full-2020-11-17/models/english-left3words-distsim.tagger"
-# (in some packages you also have 'english-bidirectional-distsim.tagger')
-
-# 2) Build the tagger
+# Build the tagger, from the jar and model next to this file (stanford_server paths),
+# so that it can be imported from any working directory
 tagger = StanfordPOSTagger(
     model_filename=STANFORD_MODEL,
     path_to_jar=STANFORD_JAR,
@@ -29,13 +23,26 @@ tagger = StanfordPOSTagger(
 
 def tokenize_text_nltk(text: str) -> list[list[str]]:
     """Tokenizes the input text into sentences and words."""
+    # Basic downloads (one time only), when the tokenizer is first needed
+    try:
+        nltk.data.find("tokenizers/punkt_tab")
+    except LookupError:
+        nltk.download("punkt_tab")
     sents = nltk.sent_tokenize(text)
     tokenized = [nltk.word_tokenize(s) for s in sents]
     return tokenized
 
 
-def stanford_pos(tokenized_text: list[list[str]]) -> list[list[tuple[str, str]]]:
-    """Returns list of sentences, each as [(token, PTB_tag), ...]."""
+def stanford_pos(
+    tokenized_text: list[list[str]], server: Optional[StanfordTaggerClient] = None
+) -> list[list[tuple[str, str]]]:
+    """Returns list of sentences, each as [(token, PTB_tag), ...].
+
+    Without ``server``, every call starts a new JVM through NLTK. With the client of a
+    running ``stanford_server.StanfordTaggerServer``, the already loaded model is used.
+    """
+    if server is not None:
+        return server.tag_sents(tokenized_text)
     tagged_sents = list(tagger.tag_sents(tokenized_text))  # one call per block
     return tagged_sents
 
@@ -0,0 +1,217 @@
+# stanford_server.py
+import os
+import socket
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+
+STANFORD_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "stanford-postagger-full-2020-11-17"
+)
+STANFORD_JAR = os.path.join(STANFORD_DIR, "stanford-postagger-4.2.0.jar")
+STANFORD_MODEL = os.path.join(STANFORD_DIR, "models", "english-left3words-distsim.tagger")
+
+SERVER_CLASS = "edu.stanford.nlp.tagger.maxent.MaxentTaggerServer"
+TAG_SEPARATOR = "_"
+
+
+class StanfordTaggerClient:
+    """Client of a ``MaxentTaggerServer``, tagging pre-tokenized sentences.
+
+    The server answers one sentence per connection (it reads one line, tags it and
+    closes the socket), and runs every connection in its own thread. The client keeps
+    up to ``max_connections`` requests in flight, so a batch is tagged concurrently
+    instead of one sentence at a time. It only holds the server address, so it can be
+    pickled and used from several worker processes sharing one server.
+
+    Parameters
+    ----------
+    host : str, optional
+        Host of the server, by default "127.0.0.1"
+    port : int, optional
+        Port of the server, by default 2020
+    max_connections : int, optional
+        Maximum number of concurrent requests, by default 8
+    timeout : float, optional
+        Socket timeout in seconds, by default 60.0
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 2020,
+        max_connections: int = 8,
+        timeout: float = 60.0,
+    ):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.timeout = timeout
+
+    def tag(self, tokens: list[str]) -> list[tuple[str, str]]:
+        """Tag one pre-tokenized sentence, returning [(token, PTB_tag), ...]."""
+        if not tokens:
+            return []
+
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as conn:
+            # With -tokenize false the server splits the line on whitespace
+            conn.sendall((" ".join(tokens) + "\n").encode("utf-8"))
+            conn.shutdown(socket.SHUT_WR)
+            chunks = []
+            while chunk := conn.recv(65536):
+                chunks.append(chunk)
+
+        # "word_TAG word_TAG ...", where the word itself may contain the separator
+        tags = [
+            tagged.rsplit(TAG_SEPARATOR, 1)[-1]
+            for tagged in b"".join(chunks).decode("utf-8").split()
+        ]
+        if len(tags) != len(tokens):
+            raise ValueError(
+                f"The tagger returned {len(tags)} tags for {len(tokens)} tokens "
+                "(tokens must not contain whitespace)"
+            )
+        return list(zip(tokens, tags))
+
+    def tag_sents(self, sentences: list[list[str]]) -> list[list[tuple[str, str]]]:
+        """Tag a batch of pre-tokenized sentences, keeping their order."""
+        if len(sentences) <= 1 or self.max_connections == 1:
+            return [self.tag(sentence) for sentence in sentences]
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            return list(executor.map(self.tag, sentences))
+
+
+class StanfordTaggerServer:
+    """Long-lived Stanford POS tagger, served on a local port by ``MaxentTaggerServer``.
+
+    The JVM is started once and keeps the model loaded, so tagging requests do not pay
+    for JVM startup and model loading as ``StanfordPOSTagger.tag_sents`` does on every
+    call. Use it as a context manager, and tag through ``client()``.
+
+    Parameters
+    ----------
+    jar : str, optional
+        Path to the tagger jar, by default the bundled stanford-postagger-4.2.0.jar
+    model : str, optional
+        Path to the tagger model, by default english-left3words-distsim.tagger
+    port : Optional[int], optional
+        Port to listen on, by default None (a free port is chosen)
+    java_options : tuple[str, ...], optional
+        Options of the JVM, by default ("-mx1g",)
+    startup_timeout : float, optional
+        Seconds to wait for the model to be loaded, by default 120.0
+    """
+
+    def __init__(
+        self,
+        jar: str = STANFORD_JAR,
+        model: str = STANFORD_MODEL,
+        port: Optional[int] = None,
+        java_options: tuple[str, ...] = ("-mx1g",),
+        startup_timeout: float = 120.0,
+    ):
+        self.jar = jar
+        self.model = model
+        self.port = port
+        self.java_options = java_options
+        self.startup_timeout = startup_timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._log = None
+
+    def start(self) -> "StanfordTaggerServer":
+        """Start the JVM and wait until the server accepts connections."""
+        if self._process is not None:
+            return self
+
+        if self.port is None:
+            # Let the OS pick a free port
+            with socket.socket() as probe:
+                probe.bind(("127.0.0.1", 0))
+                self.port = probe.getsockname()[1]
+
+        command = [
+            "java",
+            *self.java_options,
+            "-cp",
+            self.jar,
+            SERVER_CLASS,
+            "-model",
+            self.model,
+            "-port",
+            str(self.port),
+            "-tokenize",
+            "false",
+            "-encoding",
+            "utf-8",
+        ]
+        # The JVM log goes to a file: an unread pipe could fill up and block the server
+        self._log = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=self._log)
+
+        # The port is only opened once the model is loaded
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            if self._process.poll() is not None:
+                self._log.seek(0)
+                log = self._log.read().decode("utf-8", errors="replace")
+                self.stop()
+                raise RuntimeError(f"The Stanford tagger server exited:\n{log}")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise TimeoutError(
+                        f"The Stanford tagger server did not start in {self.startup_timeout}s"
+                    ) from None
+                time.sleep(0.2)
+
+        print(f"Stanford tagger server listening on port {self.port}")
+        return self
+
+    def client(self, max_connections: int = 8) -> StanfordTaggerClient:
+        """Client of this server; it can be shared with worker processes."""
+        if self._process is None or self.port is None:
+            raise RuntimeError("The Stanford tagger server is not running, call start()")
+        return StanfordTaggerClient("127.0.0.1", self.port, max_connections=max_connections)
+
+    def stop(self) -> None:
+        """Stop the JVM."""
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def __enter__(self) -> "StanfordTaggerServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import nltk
+
+    sample = "Time flies like an arrow; fruit flies like a banana. The old man the boats."
+    tokenized_sample = [nltk.word_tokenize(s) for s in nltk.sent_tokenize(sample)]
+
+    with StanfordTaggerServer() as server:
+        tagger = server.client()
+        for _ in range(3):
+            start = time.perf_counter()
+            tagged = tagger.tag_sents(tokenized_sample)
+            print(f"Tagged {len(tagged)} sentences in {time.perf_counter() - start:.3f}s")
+        for i, sent in enumerate(tagged):
+            print(f"Sentence {i + 1}:")
+            print(sent)
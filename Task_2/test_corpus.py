@@ -1,9 +1,13 @@
+import warnings
 from typing import TypedDict
 
 import nltk
+import numpy as np
 from nltk.corpus import treebank
+from pos_metrics import align_tokens, encode_tagged, tagging_report, unmatched_gold_tokens
 from pos_spacy import spacy_pos
 from standford_pos_nltk import stanford_pos
+from treebank_cache import decode_tagged, decode_tokens, load_treebank_cache
 
 
 class POSMismatch(TypedDict):
@@ -76,13 +80,30 @@ def compare_pos_taggers(pos_tag_output_1, pos_tag_output_2) -> list[POSMismatch]
     """
     Compares the output of two POS taggers.
     """
-    mismatches = []
-    for sent1, sent2 in zip(pos_tag_output_1, pos_tag_output_2):
-        for (word1, tag1), (word2, tag2) in zip(sent1, sent2):
-            if tag1 != tag2:
-                # print(f"Tag mismatch: {tag1} != {tag2}")
-                mismatches.append({"word1": word1, "tag1": tag1, "word2": word2, "tag2": tag2})
-    return mismatches
+    tag_index: dict[str, int] = {}
+    encoded_1 = encode_tagged(pos_tag_output_1, tag_index)
+    encoded_2 = encode_tagged(pos_tag_output_2, tag_index)
+    positions_1, positions_2, misaligned = align_tokens(encoded_1, encoded_2)
+    n_sents_1, n_sents_2 = len(encoded_1.offsets) - 1, len(encoded_2.offsets) - 1
+    if n_sents_1 != n_sents_2:
+        warnings.warn(f"The taggers returned {n_sents_1} and {n_sents_2} sentences", stacklevel=2)
+    if len(misaligned) > 0:
+        warnings.warn(
+            f"The tokens of {len(misaligned)} sentences differ between the taggers", stacklevel=2
+        )
+
+    differs = encoded_1.tag_ids[positions_1] != encoded_2.tag_ids[positions_2]
+    tags = np.array(sorted(tag_index, key=tag_index.__getitem__), dtype=object)
+    positions_1, positions_2 = positions_1[differs], positions_2[differs]
+    return [
+        {"word1": word1, "tag1": tag1, "word2": word2, "tag2": tag2}
+        for word1, tag1, word2, tag2 in zip(
+            encoded_1.words[positions_1].tolist(),
+            tags[encoded_1.tag_ids[positions_1]].tolist(),
+            encoded_2.words[positions_2].tolist(),
+            tags[encoded_2.tag_ids[positions_2]].tolist(),
+        )
+    ]
 
 
 def accuracy(
@@ -90,35 +111,46 @@ def accuracy(
 ) -> float | tuple[float, list[POSMismatchGold]]:
     """
     Computes the accuracy of a POS tagger's output compared to the gold standard.
+
+    The gold tokens that no output token is aligned with count as errors. See
+    ``tagging_report`` for the confusion matrix and per-tag metrics.
     """
-    correct = 0
-    total = 0
-    mismatches = []
-    for sent, gold_sent in zip(pos_tag_output, gold):
-        for (word, tag), (gold_word, gold_tag) in zip(sent, gold_sent):
-            if tag == gold_tag:
-                correct += 1
-            else:
-                if return_mismatches:
-                    mismatches.append(
-                        {
-                            "word": word,
-                            "model_tag": tag,
-                            "gold_word": gold_word,
-                            "gold_tag": gold_tag,
-                        }
-                    )
-            total += 1
-    if return_mismatches:
-        return correct / total if total > 0 else 0.0, mismatches
-    else:
-        return correct / total if total > 0 else 0.0
+    tag_index: dict[str, int] = {}
+    encoded = encode_tagged(pos_tag_output, tag_index)
+    encoded_gold = encode_tagged(gold, tag_index)
+    positions, gold_positions, misaligned = align_tokens(encoded, encoded_gold)
+    unmatched = unmatched_gold_tokens(encoded, encoded_gold, gold_positions)
+    if len(misaligned) > 0:
+        warnings.warn(
+            f"The tokens of {len(misaligned)} sentences differ from the gold standard",
+            stacklevel=2,
+        )
 
+    differs = encoded.tag_ids[positions] != encoded_gold.tag_ids[gold_positions]
+    total = len(positions) + len(unmatched)
+    acc = (len(positions) - int(differs.sum())) / total if total > 0 else 0.0
+    if not return_mismatches:
+        return acc
+
+    tags = np.array(sorted(tag_index, key=tag_index.__getitem__), dtype=object)
+    positions, gold_positions = positions[differs], gold_positions[differs]
+    mismatches: list[POSMismatchGold] = [
+        {"word": word, "model_tag": model_tag, "gold_word": gold_word, "gold_tag": gold_tag}
+        for word, model_tag, gold_word, gold_tag in zip(
+            encoded.words[positions].tolist(),
+            tags[encoded.tag_ids[positions]].tolist(),
+            encoded_gold.words[gold_positions].tolist(),
+            tags[encoded_gold.tag_ids[gold_positions]].tolist(),
+        )
+    ]
+    return acc, mismatches
 
-if __name__ == "__main__":
-    gold = treebank.tagged_sents()  # POS PTB
 
-    tokenized_text = extract_tokens_from_gold(gold[:3])
+if __name__ == "__main__":
+    # Trace-free gold standard, parsed once and then loaded from the cache
+    encoded_gold, tag_index = load_treebank_cache(sentences=range(15))
+    gold_no_traces = decode_tagged(encoded_gold, tag_index)
+    tokenized_text = decode_tokens(encoded_gold)
 
     pos_tag_output_st_nltk = stanford_pos(tokenized_text)
     pos_tag_output_spacy = spacy_pos(tokenized_text)
@@ -129,7 +161,20 @@ if __name__ == "__main__":
             f"Word: {mismatch['word1']}, Stanford NLTK Tag: {mismatch['tag1']}, spaCy Tag: {mismatch['tag2']}"
         )
 
-    acc_st_nltk, mismatches_st_nltk = accuracy(pos_tag_output_st_nltk, gold, return_mismatches=True)  # type: ignore
-    acc_spacy, mismatches_spacy = accuracy(pos_tag_output_spacy, gold, return_mismatches=True)  # type: ignore
+    acc_st_nltk, mismatches_st_nltk = accuracy(
+        pos_tag_output_st_nltk, gold_no_traces, return_mismatches=True
+    )  # type: ignore
+    acc_spacy, mismatches_spacy = accuracy(
+        pos_tag_output_spacy, gold_no_traces, return_mismatches=True
+    )  # type: ignore
     print(f"Accuracy (Stanford NLTK): {acc_st_nltk:.4f}")
     print(f"Accuracy (spaCy): {acc_spacy:.4f}")
+
+    # The encoded gold standard is reused for every tagger
+    for name, output in (
+        ("Stanford NLTK", pos_tag_output_st_nltk),
+        ("spaCy", pos_tag_output_spacy),
+    ):
+        report = tagging_report(encode_tagged(output, tag_index), encoded_gold, tag_index)
+        print(f"Per-tag precision/recall ({name}):")
+        print(report["per_tag"][report["per_tag"]["support"] > 0].round(4))
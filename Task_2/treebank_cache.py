@@ -0,0 +1,194 @@
+import hashlib
+import os
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+from nltk.corpus import treebank
+
+from text_mining.column_store import read_string_column, replace_directory, write_string_column
+
+
+TREEBANK_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "treebank_cache"
+)
+TRACE_TAG = "-NONE-"
+
+
+class EncodedTags(NamedTuple):
+    """Tagged sentences as flat arrays: the words and tag ids of all tokens, and the
+    (n_sentences + 1) offsets of each sentence in them."""
+
+    words: np.ndarray
+    tag_ids: np.ndarray
+    offsets: np.ndarray
+
+
+def _pointer_signature(pointer) -> str:
+    """Identify the state of a corpus file without reading it."""
+    if hasattr(pointer, "zipfile"):
+        # File inside the corpus zip: its CRC changes with its content
+        info = pointer.zipfile.getinfo(pointer.entry)
+        return f"{info.CRC}:{info.file_size}"
+    stat = os.stat(pointer.path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def treebank_fingerprint(corpus=treebank) -> str:
+    """Fingerprint of the files of an NLTK tagged corpus, computed without parsing them.
+
+    Parameters
+    ----------
+    corpus : CorpusReader, optional
+        NLTK corpus reader, by default the Penn Treebank sample
+
+    Returns
+    -------
+    str
+        Hash of the name, size and modification time (CRC for zipped corpora) of each
+        file of the corpus.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for fileid in corpus.fileids():
+        digest.update(f"{fileid}={_pointer_signature(corpus.abspath(fileid))}\n".encode())
+    return digest.hexdigest()
+
+
+def build_treebank_cache(
+    cache_dir: str = TREEBANK_CACHE_DIR, corpus=treebank, fingerprint: Optional[str] = None
+) -> None:
+    """Parse the gold standard once and store it as memory-mappable ``.npy`` arrays.
+
+    The traces (-NONE-) are dropped, as ``drop_traces_tagged`` does, and the remaining
+    tokens are stored as a UTF-8 blob of words, one tag id per token and the sentence
+    offsets, together with the tag vocabulary and the fingerprint of the corpus files.
+
+    Parameters
+    ----------
+    cache_dir : str, optional
+        Directory of the cache, by default Task_2/data/treebank_cache
+    corpus : CorpusReader, optional
+        NLTK tagged corpus reader, by default the Penn Treebank sample
+    fingerprint : Optional[str], optional
+        Precomputed ``treebank_fingerprint(corpus)``, by default None
+    """
+    fingerprint = fingerprint or treebank_fingerprint(corpus)
+
+    print("Parsing the treebank gold standard...")
+    sentences = [
+        [(word, tag) for word, tag in sent if tag != TRACE_TAG] for sent in corpus.tagged_sents()
+    ]
+    tag_index: dict[str, int] = {}
+    tag_ids = np.array(
+        [tag_index.setdefault(tag, len(tag_index)) for sent in sentences for _, tag in sent],
+        dtype=np.int16,
+    )
+    sent_offsets = np.zeros(len(sentences) + 1, dtype=np.int64)
+    np.cumsum([len(sent) for sent in sentences], out=sent_offsets[1:])
+
+    # Write the cache next to the old one, then swap them
+    with replace_directory(cache_dir) as tmp_dir:
+        write_string_column(tmp_dir, "words", [word for sent in sentences for word, _ in sent])
+        write_string_column(tmp_dir, "tags", list(tag_index))
+        np.save(os.path.join(tmp_dir, "tag_ids.npy"), tag_ids)
+        np.save(os.path.join(tmp_dir, "sent_offsets.npy"), sent_offsets)
+        with open(os.path.join(tmp_dir, "fingerprint.txt"), "w") as f:
+            f.write(fingerprint)
+    print(f"Cached {len(sentences)} sentences ({len(tag_ids)} tokens) in {cache_dir}")
+
+
+def load_treebank_cache(
+    cache_dir: str = TREEBANK_CACHE_DIR,
+    sentences: Optional[Sequence[int]] = None,
+    corpus=treebank,
+    check: bool = True,
+) -> tuple[EncodedTags, dict[str, int]]:
+    """Load the trace-free gold standard, (re)building the cache if it is missing or stale.
+
+    Only the requested sentences are decoded, so a random subset of the treebank is
+    loaded without parsing it, and without reading the other sentences.
+
+    Parameters
+    ----------
+    cache_dir : str, optional
+        Directory of the cache, by default Task_2/data/treebank_cache
+    sentences : Optional[Sequence[int]], optional
+        Indices of the sentences to load, in the order to return them, by default None
+        (all the sentences)
+    corpus : CorpusReader, optional
+        NLTK tagged corpus reader, by default the Penn Treebank sample
+    check : bool, optional
+        Compare the fingerprint of the corpus files with the cached one, by default
+        True. With False an existing cache is used as is.
+
+    Returns
+    -------
+    tuple[EncodedTags, dict[str, int]]
+        The words, tag ids and sentence offsets of the gold standard, as
+        ``pos_metrics.encode_tagged`` returns them, and the tag index of the ids.
+    """
+    fingerprint_path = os.path.join(cache_dir, "fingerprint.txt")
+    if check or not os.path.exists(fingerprint_path):
+        fingerprint = treebank_fingerprint(corpus)
+        cached = None
+        if os.path.exists(fingerprint_path):
+            with open(fingerprint_path) as f:
+                cached = f.read()
+        if cached != fingerprint:
+            build_treebank_cache(cache_dir, corpus, fingerprint)
+
+    sent_offsets = np.load(os.path.join(cache_dir, "sent_offsets.npy"))
+    tag_ids = np.load(os.path.join(cache_dir, "tag_ids.npy"), mmap_mode="r")
+    tag_index = {tag: i for i, tag in enumerate(read_string_column(cache_dir, "tags"))}
+
+    if sentences is None:
+        token_indices = None
+        offsets = sent_offsets
+        tag_ids = np.asarray(tag_ids, dtype=np.int64)
+    else:
+        sentences = np.asarray(sentences, dtype=np.int64)
+        starts = sent_offsets[sentences]
+        lengths = sent_offsets[sentences + 1] - starts
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        # Token indices of the selected sentences, one run per sentence
+        token_indices = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        tag_ids = tag_ids[token_indices].astype(np.int64)
+
+    words = np.array(read_string_column(cache_dir, "words", token_indices), dtype=object)
+    return EncodedTags(words, tag_ids, offsets), tag_index
+
+
+def decode_tagged(encoded: EncodedTags, tag_index: dict[str, int]) -> list[list[tuple[str, str]]]:
+    """Back to tagged sentences [[(word, tag), ...], ...], as ``drop_traces_tagged`` returns."""
+    tags = np.array(sorted(tag_index, key=tag_index.__getitem__), dtype=object)
+    words = encoded.words.tolist()
+    word_tags = tags[encoded.tag_ids].tolist()
+    bounds = encoded.offsets.tolist()
+    return [
+        list(zip(words[start:end], word_tags[start:end]))
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def decode_tokens(encoded: EncodedTags) -> list[list[str]]:
+    """Tokens of each sentence, as ``extract_tokens_from_gold`` returns them."""
+    words = encoded.words.tolist()
+    bounds = encoded.offsets.tolist()
+    return [words[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    gold, tag_index = load_treebank_cache()
+    print(
+        f"Loaded {len(gold.offsets) - 1} gold sentences ({len(gold.words)} tokens) "
+        f"in {time.perf_counter() - start:.3f}s"
+    )
+
+    rng = np.random.default_rng(42)
+    subset = rng.choice(len(gold.offsets) - 1, size=15, replace=False)
+    start = time.perf_counter()
+    gold_subset, _ = load_treebank_cache(sentences=subset, check=False)
+    print(f"Loaded 15 random sentences in {time.perf_counter() - start:.3f}s")
+    print(decode_tagged(gold_subset, tag_index)[0])
@@ -0,0 +1,85 @@
+import re
+import time
+from typing import Iterable
+
+import pandas as pd
+from text_preprocessing import _process_tokens, _TokenCache, clean_corpus
+
+from text_mining.spacy_models import LEMMATIZER_COMPONENTS, TOKENIZER_COMPONENTS, load_spacy_model
+
+
+def _legacy_process_tokens(doc, lemmatize: bool) -> str:
+    """Token filter as it was before the lexeme cache (per-token regex), for comparison."""
+    tokens = [
+        token.lemma_.lower() if lemmatize else token.text.lower()
+        for token in doc
+        if not token.is_punct
+        and not token.is_space
+        and token.text.strip() != ""
+        and not re.match(r"^[\s\t\n\r]+$", token.text)
+        and not re.match(r"^[^\w\s]+$", token.text)
+        and len(token.text.strip()) > 0
+    ]
+    return " ".join(tokens)
+
+
+def benchmark_token_filter(
+    texts: Iterable[str], model: str = "en_core_web_sm", lemmatize: bool = True
+) -> dict[str, float]:
+    """Measure the per-document cost of the token filter, before and after.
+
+    Documents are parsed once up front, so only the filtering step is timed.
+
+    Parameters
+    ----------
+    texts : Iterable[str]
+        Cleaned documents to parse and filter.
+    model : str, optional
+        The spaCy model to use, by default "en_core_web_sm"
+    lemmatize : bool, optional
+        Whether the filter outputs lemmas, by default True
+
+    Returns
+    -------
+    dict[str, float]
+        Number of documents and tokens, and mean filter time per document (in
+        microseconds) of the legacy and current implementations.
+    """
+    nlp = load_spacy_model(model, LEMMATIZER_COMPONENTS if lemmatize else TOKENIZER_COMPONENTS)
+    docs = list(nlp.pipe(texts, batch_size=1000))
+
+    start = time.perf_counter()
+    legacy_output = [_legacy_process_tokens(doc, lemmatize) for doc in docs]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    token_cache = _TokenCache({}, {})
+    output = [_process_tokens(doc, lemmatize, token_cache) for doc in docs]
+    current_time = time.perf_counter() - start
+
+    if output != legacy_output:
+        raise AssertionError("The token filter output differs from the legacy implementation")
+
+    n_docs = max(len(docs), 1)
+    return {
+        "documents": len(docs),
+        "tokens": sum(len(doc) for doc in docs),
+        "legacy_us_per_doc": legacy_time / n_docs * 1e6,
+        "current_us_per_doc": current_time / n_docs * 1e6,
+        "speedup": legacy_time / current_time if current_time > 0 else float("inf"),
+    }
+
+
+if __name__ == "__main__":
+    corpus_raw_df = pd.read_csv("data/corpus_raw.csv")
+    cleaned = clean_corpus(corpus_raw_df["content"])
+
+    for lemmatize in (True, False):
+        results = benchmark_token_filter(cleaned, lemmatize=lemmatize)
+        print(f"lemmatize={lemmatize}:")
+        print(
+            f"  {results['documents']} documents, {results['tokens']} tokens\n"
+            f"  legacy filter:  {results['legacy_us_per_doc']:.1f} us/doc\n"
+            f"  current filter: {results['current_us_per_doc']:.1f} us/doc "
+            f"({results['speedup']:.1f}x)"
+        )
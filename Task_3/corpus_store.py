@@ -0,0 +1,176 @@
+import hashlib
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from text_preprocessing import clean_corpus
+from utils import read_documents, scan_corpus
+
+from text_mining.column_store import read_string_column, replace_directory, write_string_column
+
+
+STRING_COLUMNS = ["category", "document_id", "file_path", "content", "cleaned_content"]
+STORE_COLUMNS = STRING_COLUMNS + ["content_hash", "size", "mtime_ns"]
+HASH_SIZE = 16
+
+
+def _content_hash(content: str) -> bytes:
+    """Hash of a document's content, used to detect modified files."""
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=HASH_SIZE).digest()
+
+
+def load_corpus_store(store_path: str, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Load the corpus (or some of its columns) from a store built by ``sync_corpus_store``.
+
+    Each column lives in its own file and text columns are memory-mapped, so only the
+    requested columns are read from disk.
+
+    Parameters
+    ----------
+    store_path : str
+        Directory of the corpus store.
+    columns : Optional[Iterable[str]], optional
+        Columns to load among 'category', 'document_id', 'file_path', 'content',
+        'cleaned_content', 'content_hash', 'size' and 'mtime_ns'. By default None,
+        which loads all of them.
+
+    Returns
+    -------
+    pd.DataFrame
+        The stored corpus, one row per document, with 'category' as categorical.
+    """
+    columns = list(columns) if columns is not None else STORE_COLUMNS
+
+    data = {}
+    for column in columns:
+        if column in STRING_COLUMNS:
+            data[column] = read_string_column(store_path, column)
+        elif column == "content_hash":
+            hashes = np.load(os.path.join(store_path, "content_hash.npy"))
+            data[column] = [row.tobytes().hex() for row in hashes]
+        elif column in ("size", "mtime_ns"):
+            data[column] = np.load(os.path.join(store_path, f"{column}.npy"))
+        else:
+            raise ValueError(f"Unknown corpus store column: {column}")
+
+    df = pd.DataFrame(data, columns=columns)
+    if "category" in df:
+        df["category"] = df["category"].astype("category")
+    return df
+
+
+def sync_corpus_store(
+    corpus_path: str, store_path: str, max_workers: Optional[int] = None
+) -> pd.DataFrame:
+    """Bring the corpus store up to date with the corpus directory.
+
+    Documents are keyed by (category, document_id). A document is read again only if
+    its size or modification time changed, and cleaned again only if its content hash
+    changed, so re-ingesting a corpus where one file changed costs one file of work.
+    Documents that no longer exist are dropped from the store.
+
+    Parameters
+    ----------
+    corpus_path : str
+        Path to the corpus directory
+    store_path : str
+        Directory of the corpus store, created if it does not exist
+    max_workers : Optional[int], optional
+        Number of threads reading files, by default None (ThreadPoolExecutor default)
+
+    Returns
+    -------
+    pd.DataFrame
+        The up-to-date corpus, as returned by ``load_corpus_store``.
+    """
+    entries = list(scan_corpus(corpus_path))
+    stats = [os.stat(file_path) for _, _, file_path in entries]
+    sizes = np.array([stat.st_size for stat in stats], dtype=np.int64)
+    mtimes = np.array([stat.st_mtime_ns for stat in stats], dtype=np.int64)
+
+    # Previous state of the store, indexed by (category, document_id)
+    if os.path.exists(store_path):
+        old = load_corpus_store(store_path)
+    else:
+        old = pd.DataFrame(columns=STORE_COLUMNS)
+    old_rows = {key: i for i, key in enumerate(zip(old["category"], old["document_id"]))}
+    old_content = old["content"].tolist()
+    old_cleaned = old["cleaned_content"].tolist()
+    old_hashes = old["content_hash"].tolist()
+
+    # Rows whose file changed on disk (or is new) must be read again
+    old_index = np.array(
+        [old_rows.get((category, document_id), -1) for category, document_id, _ in entries],
+        dtype=np.int64,
+    )
+    unchanged = old_index >= 0
+    unchanged[unchanged] = (
+        sizes[unchanged] == old["size"].to_numpy(dtype=np.int64)[old_index[unchanged]]
+    ) & (mtimes[unchanged] == old["mtime_ns"].to_numpy(dtype=np.int64)[old_index[unchanged]])
+    to_read = np.flatnonzero(~unchanged)
+    read_contents = read_documents([entries[i][2] for i in to_read], max_workers)
+
+    contents: list[Optional[str]] = [None] * len(entries)
+    cleaned: list[Optional[str]] = [None] * len(entries)
+    hashes = np.zeros((len(entries), HASH_SIZE), dtype=np.uint8)
+
+    for i in np.flatnonzero(unchanged):
+        j = old_index[i]
+        contents[i] = old_content[j]
+        cleaned[i] = old_cleaned[j]
+        hashes[i] = np.frombuffer(bytes.fromhex(old_hashes[j]), dtype=np.uint8)
+
+    # Among the files read again, only those whose content changed are cleaned again
+    to_clean = []
+    for i, content in zip(to_read, read_contents):
+        if content is None:
+            continue
+        digest = _content_hash(content)
+        hashes[i] = np.frombuffer(digest, dtype=np.uint8)
+        contents[i] = content
+        j = old_index[i]
+        if j >= 0 and old_hashes[j] == digest.hex():
+            cleaned[i] = old_cleaned[j]
+        else:
+            to_clean.append(i)
+
+    for i, cleaned_content in zip(to_clean, clean_corpus([contents[i] for i in to_clean])):  # type: ignore
+        cleaned[i] = cleaned_content
+
+    n_removed = len(old_rows) - int((old_index >= 0).sum())
+    print(
+        f"Corpus store: {len(to_clean)} new or modified, "
+        f"{len(entries) - len(to_clean)} unchanged, {n_removed} removed documents"
+    )
+
+    # Unreadable files are skipped, as in build_corpus_dataframe
+    keep = [i for i, content in enumerate(contents) if content is not None]
+
+    # Write the new state next to the old one, then swap them
+    with replace_directory(store_path) as tmp_path:
+        write_string_column(tmp_path, "category", [entries[i][0] for i in keep])
+        write_string_column(tmp_path, "document_id", [entries[i][1] for i in keep])
+        write_string_column(tmp_path, "file_path", [entries[i][2] for i in keep])
+        write_string_column(tmp_path, "content", [contents[i] for i in keep])  # type: ignore
+        write_string_column(tmp_path, "cleaned_content", [cleaned[i] for i in keep])  # type: ignore
+        np.save(os.path.join(tmp_path, "content_hash.npy"), hashes[keep])
+        np.save(os.path.join(tmp_path, "size.npy"), sizes[keep])
+        np.save(os.path.join(tmp_path, "mtime_ns.npy"), mtimes[keep])
+
+    return load_corpus_store(store_path)
+
+
+if __name__ == "__main__":
+    import time
+
+    corpus_path = "data/Corpus-representacion"
+    store_path = "data/corpus_store"
+
+    sync_corpus_store(corpus_path, store_path)
+
+    start = time.perf_counter()
+    corpus_df = load_corpus_store(
+        store_path, columns=["category", "document_id", "cleaned_content"]
+    )
+    print(f"Loaded {len(corpus_df)} cleaned documents in {time.perf_counter() - start:.3f}s")
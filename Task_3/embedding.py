@@ -1,10 +1,18 @@
+import hashlib
 import os
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Iterable, Optional, Sequence, Union
 
 import gensim
 import gensim.downloader as api
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from vectorizing import vectorize_text
 
 
 def get_word_vector(model: gensim.models.KeyedVectors, word: str):
@@ -25,19 +33,55 @@ def get_word_vector(model: gensim.models.KeyedVectors, word: str):
     return model[word]
 
 
-def load_model(model: str = "fasttext-wiki-news-subwords-300") -> gensim.models.KeyedVectors:
-    """Load a word embeddings model.
+def _prune_vocabulary(
+    model: gensim.models.KeyedVectors, vocabulary: Iterable[str]
+) -> gensim.models.KeyedVectors:
+    """Keep only the words of ``vocabulary`` (in the model's original order)."""
+    vocabulary = set(vocabulary)
+    keys = [key for key in model.index_to_key if key in vocabulary]
+    pruned = gensim.models.KeyedVectors(model.vector_size, dtype=model.vectors.dtype)
+    pruned.add_vectors(keys, model.vectors[[model.key_to_index[key] for key in keys]])
+    return pruned
+
+
+def snapshot_model(
+    model: str = "fasttext-wiki-news-subwords-300",
+    cache_dir: Optional[str] = None,
+    vocabulary: Optional[Iterable[str]] = None,
+) -> str:
+    """Convert a word embeddings model to gensim's native format, once.
+
+    The snapshot stores the vectors as a separate ``.npy`` file, so it can be loaded
+    with ``mmap="r"`` in well under a second and shared between processes.
 
     Parameters
     ----------
     model : str, optional
-        The name of the model to load, by default "fasttext-wiki-news-subwords-300"
+        The name of the model to convert, by default "fasttext-wiki-news-subwords-300"
+    cache_dir : Optional[str], optional
+        Directory of the snapshots, by default None (``kv_snapshots`` in the gensim-data
+        directory)
+    vocabulary : Optional[Iterable[str]], optional
+        If given, only these words are kept (e.g. the tokens of the preprocessed corpus),
+        by default None
 
     Returns
     -------
-    gensim.models.KeyedVectors
-        The loaded word embeddings model.
+    str
+        Path of the snapshot, to be loaded with ``KeyedVectors.load``.
     """
+    cache_dir = cache_dir or os.path.join(api.BASE_DIR, "kv_snapshots")
+
+    snapshot_name = model
+    if vocabulary is not None:
+        vocabulary = sorted(set(vocabulary))
+        digest = hashlib.blake2b("\n".join(vocabulary).encode("utf-8"), digest_size=8)
+        snapshot_name = f"{model}-pruned-{digest.hexdigest()}"
+    snapshot_path = os.path.join(cache_dir, f"{snapshot_name}.kv")
+
+    if os.path.exists(snapshot_path):
+        return snapshot_path
+
     # Check if model is already downloaded
     model_path = os.path.join(api.BASE_DIR, model)
 
@@ -48,81 +92,389 @@ def load_model(model: str = "fasttext-wiki-news-subwords-300") -> gensim.models.
         print("This may take several minutes depending on your internet connection.")
 
     print(f"Loading model: {model}...")
-    model_obj = api.load(model)
+    model_obj: gensim.models.KeyedVectors = api.load(model)  # type: ignore
+
+    if vocabulary is not None:
+        model_obj = _prune_vocabulary(model_obj, vocabulary)
+        print(f"Vocabulary pruned to {len(model_obj)} words")
+
+    # sep_limit=0 stores every array (the vectors) in its own .npy file, which is mmap-able
+    os.makedirs(cache_dir, exist_ok=True)
+    model_obj.save(snapshot_path, sep_limit=0)
+    print(f"Model snapshot saved at: {snapshot_path}")
+    return snapshot_path
+
+
+def load_model(
+    model: str = "fasttext-wiki-news-subwords-300",
+    cache_dir: Optional[str] = None,
+    vocabulary: Optional[Iterable[str]] = None,
+) -> gensim.models.KeyedVectors:
+    """Load a word embeddings model.
+
+    The first call converts the model to a native snapshot (see ``snapshot_model``);
+    later calls memory-map that snapshot read-only, so startup is fast and the vectors
+    are shared between processes through the page cache.
+
+    Parameters
+    ----------
+    model : str, optional
+        The name of the model to load, by default "fasttext-wiki-news-subwords-300"
+    cache_dir : Optional[str], optional
+        Directory of the snapshots, by default None (``kv_snapshots`` in the gensim-data
+        directory)
+    vocabulary : Optional[Iterable[str]], optional
+        If given, only these words are kept (e.g. the tokens of the preprocessed corpus),
+        by default None
+
+    Returns
+    -------
+    gensim.models.KeyedVectors
+        The loaded word embeddings model, with read-only memory-mapped vectors.
+    """
+    snapshot_path = snapshot_model(model, cache_dir=cache_dir, vocabulary=vocabulary)
+
+    print(f"Loading model: {model}...")
+    model_obj = gensim.models.KeyedVectors.load(snapshot_path, mmap="r")
     print("Model loaded successfully!")
-    return model_obj  # type: ignore
+    return model_obj
+
+
+def _lookup_vectors(model: gensim.models.KeyedVectors, words: list[str]) -> np.ndarray:
+    """Gather the vectors of a list of unique words into a single matrix.
+
+    In-vocabulary words are fetched in bulk from ``model.vectors``. Words missing from
+    ``model.key_to_index`` go through ``get_word_vector`` once each, so models able to
+    build OOV vectors (e.g. fastText subwords) keep doing so; otherwise they are zero.
+
+    Parameters
+    ----------
+    model : gensim.models.KeyedVectors
+        The word embeddings model.
+    words : list[str]
+        Unique words to look up.
+
+    Returns
+    -------
+    np.ndarray
+        2D array of shape (len(words), model.vector_size), one row per word.
+    """
+    key_to_index = model.key_to_index
+    model_ids = np.fromiter(
+        (key_to_index.get(word, -1) for word in words), dtype=np.int64, count=len(words)
+    )
+    in_vocab = model_ids >= 0
+
+    vectors = np.zeros((len(words), model.vector_size), dtype=model.vectors.dtype)
+    vectors[in_vocab] = model.vectors[model_ids[in_vocab]]
+
+    for row in np.flatnonzero(~in_vocab):
+        try:
+            vectors[row] = get_word_vector(model, words[row])
+        except KeyError:
+            # If the word is not found (OOV), keep the zero vector
+            pass
+
+    return vectors
+
+
+def _count_matrix(
+    preprocessed_texts: Iterable[str], dtype: np.dtype
+) -> tuple[sparse.csr_matrix, np.ndarray, list[str]]:
+    """Sparse document x corpus-vocabulary count matrix of whitespace-tokenized texts.
+
+    Returns
+    -------
+    tuple[sparse.csr_matrix, np.ndarray, list[str]]
+        The count matrix, the length of each document and the corpus vocabulary (in
+        column order). Repeated words are left as duplicate entries, which matrix
+        products add up.
+    """
+    # Tokenize every document once and map each token to a corpus-level id
+    tokenized = [text.split() for text in preprocessed_texts]
+    doc_lengths = np.fromiter(map(len, tokenized), dtype=np.int64, count=len(tokenized))
+    token_ids, corpus_vocab = pd.factorize(
+        np.fromiter(chain.from_iterable(tokenized), dtype=object, count=int(doc_lengths.sum()))
+    )
+
+    indptr = np.concatenate(([0], np.cumsum(doc_lengths)))
+    counts = sparse.csr_matrix(
+        (np.ones(len(token_ids), dtype=dtype), token_ids, indptr),
+        shape=(len(tokenized), len(corpus_vocab)),
+    )
+    return counts, doc_lengths, corpus_vocab.tolist()
+
+
+def _l2_normalize(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize the non-zero rows of ``embeddings`` in place."""
+    norms = np.linalg.norm(embeddings, axis=1)
+    nonzero = norms > 0
+    embeddings[nonzero] /= norms[nonzero, None]
+    return embeddings
+
+
+def _remove_first_component(embeddings: np.ndarray) -> np.ndarray:
+    """Remove the projection of every row on the first principal component (SIF)."""
+    svd = TruncatedSVD(n_components=1, n_iter=7, random_state=42)
+    svd.fit(embeddings)
+    component = svd.components_[0]
+    return embeddings - np.outer(embeddings @ component, component)
 
 
 def create_sentence_embeddings(
-    preprocessed_texts: pd.Series, model: gensim.models.KeyedVectors, method: str = "average"
+    preprocessed_texts: pd.Series,
+    model: gensim.models.KeyedVectors,
+    method: str = "average",
+    term_matrix: Optional[tuple[sparse.csr_matrix, dict[str, int]]] = None,
+    sif_alpha: float = 1e-3,
+    dtype: Union[str, np.dtype] = np.float64,
 ) -> np.ndarray:
     """Create embeddings for a series of preprocessed texts.
 
+    Every method pools the word vectors with a single sparse (documents x vocabulary)
+    weight matrix product against the vectors of the words present in the corpus:
+
+    - "average" and "additive": the weights are the word counts (divided by the number
+      of words for "average"). Out-of-vocabulary words count as zero vectors, so they
+      still weigh in the average.
+    - "tfidf": the weights are the TF-IDF values of ``vectorizing.vectorize_text``.
+    - "sif": smooth inverse frequency (Arora et al., 2017). Each word is weighted by
+      ``sif_alpha / (sif_alpha + p(w))``, where ``p(w)`` is its frequency in the corpus,
+      the result is averaged, and the projection on the first principal component of
+      the corpus embeddings is removed.
+
     Parameters
     ----------
     preprocessed_texts : pd.Series
         Series with preprocessed texts (preprocessed_content_for_embedding column)
     model : gensim.models.KeyedVectors
         Pre-loaded embeddings model
+    method : str, optional
+        Pooling method, "average", "additive", "tfidf" or "sif", by default "average"
+    term_matrix : Optional[tuple[sparse.csr_matrix, dict[str, int]]], optional
+        TF-IDF matrix and vocabulary of ``preprocessed_texts``, as returned by
+        ``vectorize_text(preprocessed_texts, method="tfidf")``, for the "tfidf" method.
+        By default None, which computes them.
+    sif_alpha : float, optional
+        Smoothing parameter of the "sif" method, by default 1e-3
+    dtype : Union[str, np.dtype], optional
+        Data type of the output, by default float64; float32 halves its memory
 
     Returns
     -------
     np.ndarray
-        2D array where each row is the average embedding of a sentence
+        2D array where each row is the L2-normalized pooled embedding of a sentence
     """
-    if method not in ["average", "additive"]:
-        raise ValueError(f"Invalid method: {method}. Choose 'average' or 'additive'.")
+    if method not in ["average", "additive", "tfidf", "sif"]:
+        raise ValueError(
+            f"Invalid method: {method}. Choose 'average', 'additive', 'tfidf' or 'sif'."
+        )
+
+    print(f"Processing {len(preprocessed_texts)} documents...")
+    vector_dtype = model.vectors.dtype
+
+    if method == "tfidf":
+        # The TF-IDF columns are the words of the weight matrix
+        weights, vocab = term_matrix or vectorize_text(preprocessed_texts, method="tfidf")
+        if weights.shape[0] != len(preprocessed_texts) or len(vocab) != weights.shape[1]:
+            raise ValueError(
+                "term_matrix must be the TF-IDF matrix of preprocessed_texts and its vocabulary"
+            )
+        terms = [""] * len(vocab)
+        for term, column in vocab.items():
+            terms[column] = term
+        weights = weights.astype(vector_dtype)
+    else:
+        weights, doc_lengths, terms = _count_matrix(preprocessed_texts, vector_dtype)
 
-    # Obtain model dimensions
-    try:
-        vector_dim = model.vector_size  # type: ignore
-    except AttributeError:
-        # For some models, it may be vector_size or another property
-        vector_dim = len(model.get_vector(list(model.key_to_index.keys())[0]))  # type: ignore
+        if method == "sif":
+            # Smooth inverse frequency of each word in the corpus
+            word_counts = np.bincount(weights.indices, minlength=weights.shape[1])
+            word_freqs = word_counts / max(int(word_counts.sum()), 1)
+            weights = weights @ sparse.diags(
+                (sif_alpha / (sif_alpha + word_freqs)).astype(vector_dtype)
+            )
 
-    # List to store embeddings (average or sum)
-    sentence_embeddings = []
+        if method in ("average", "sif"):
+            # OOV words are zero rows in word_vectors but still count in the document length
+            weights = sparse.diags((1 / np.maximum(doc_lengths, 1)).astype(vector_dtype)) @ weights
 
-    print(f"Processing {len(preprocessed_texts)} documents...")
-    for text in tqdm(
-        preprocessed_texts, total=len(preprocessed_texts), desc="Processing documents..."
-    ):
-        words = text.split()
+    # Pool every document at once: (docs x vocab) @ (vocab x dim), in the model's dtype
+    word_vectors = _lookup_vectors(model, terms)
+    sentence_embeddings = np.asarray(weights @ word_vectors, dtype=np.float64)
+
+    if method == "sif" and len(sentence_embeddings) > 1:
+        sentence_embeddings = _remove_first_component(sentence_embeddings)
+
+    # Pooled and normalized in float64
+    return _l2_normalize(sentence_embeddings).astype(dtype, copy=False)
+
+
+# Word embeddings model of the worker processes of create_sentence_embeddings_chunked
+_WORKER_MODEL: Optional[gensim.models.KeyedVectors] = None
+
+
+def _embed_chunk(texts: list[str], model: gensim.models.KeyedVectors, method: str) -> np.ndarray:
+    """Average or additive embeddings of a chunk, as ``create_sentence_embeddings``."""
+    weights, doc_lengths, terms = _count_matrix(texts, model.vectors.dtype)
+    if method == "average":
+        weights = (
+            sparse.diags((1 / np.maximum(doc_lengths, 1)).astype(model.vectors.dtype)) @ weights
+        )
+    return _l2_normalize(np.asarray(weights @ _lookup_vectors(model, terms), dtype=np.float64))
 
-        word_embeddings = []
 
-        # Obtain embedding for each word that exists in the model.
-        for word in words:
-            try:
-                embedding = get_word_vector(model, word)
-                word_embeddings.append(embedding)
-            except KeyError:
-                # If the word is not found (OOV), use zero vector
-                embedding = np.zeros(model.vector_size)
-                word_embeddings.append(embedding)
+def _init_worker(snapshot_path: str) -> None:
+    """Memory-map the word vectors once per worker process."""
+    global _WORKER_MODEL
+    _WORKER_MODEL = gensim.models.KeyedVectors.load(snapshot_path, mmap="r")
 
-        # Initialize sent_embeddings with a default value
-        sent_embeddings = np.zeros(vector_dim)
 
-        # Calculate the sentence embedding
-        if word_embeddings:
-            word_embeddings_array = np.array(word_embeddings)
-            if method == "average":
-                sent_embeddings = np.mean(word_embeddings_array, axis=0)
-            elif method == "additive":
-                sent_embeddings = np.sum(word_embeddings_array, axis=0)
+def _embed_chunk_worker(texts: list[str], method: str) -> np.ndarray:
+    return _embed_chunk(texts, _WORKER_MODEL, method)  # type: ignore
 
-        # Apply L2 normalization to the sentence embedding
-        norm = np.linalg.norm(sent_embeddings)
-        if norm > 0:
-            sent_embeddings = sent_embeddings / norm
 
-        sentence_embeddings.append(sent_embeddings)
+def create_sentence_embeddings_chunked(
+    preprocessed_texts: Union[pd.Series, Sequence[str]],
+    model: Union[gensim.models.KeyedVectors, str],
+    method: str = "average",
+    chunk_size: int = 10000,
+    n_jobs: int = 1,
+    output_path: Optional[str] = None,
+    dtype: Union[str, np.dtype] = np.float64,
+) -> np.ndarray:
+    """Create the embeddings of a large corpus in fixed-size chunks.
+
+    Each chunk is pooled as in ``create_sentence_embeddings`` and written straight into
+    a preallocated output array, so apart from the output only ``2 * n_jobs`` chunks
+    are in memory at a time. With ``output_path`` the output is an on-disk memory map
+    and peak memory does not depend on the size of the corpus.
 
-    return np.array(sentence_embeddings)
+    Only the "average" and "additive" methods are supported, because "tfidf" and
+    "sif" need statistics of the whole corpus.
 
+    Parameters
+    ----------
+    preprocessed_texts : Union[pd.Series, Sequence[str]]
+        Preprocessed texts (preprocessed_content_for_embedding column)
+    model : Union[gensim.models.KeyedVectors, str]
+        Pre-loaded embeddings model, or path of a snapshot written by ``snapshot_model``.
+        A path is required when ``n_jobs != 1``: every worker process memory-maps the
+        snapshot, so the vectors are shared through the page cache instead of copied.
+    method : str, optional
+        Pooling method, "average" or "additive", by default "average"
+    chunk_size : int, optional
+        Number of documents pooled at once, by default 10000
+    n_jobs : int, optional
+        Number of worker processes; 1 works in the current process and -1 uses all
+        cores, by default 1
+    output_path : Optional[str], optional
+        If given, the embeddings are written to this .npy file (readable with
+        ``load_embeddings`` and extendable with ``append_embeddings``) and a read-write
+        memory map of it is returned, by default None (in-memory array)
+    dtype : Union[str, np.dtype], optional
+        Data type of the output, by default float64 (as ``create_sentence_embeddings``)
 
-def save_embeddings(embeddings: np.ndarray, filepath: str) -> None:
+    Returns
+    -------
+    np.ndarray
+        2D array where each row is the L2-normalized pooled embedding of a sentence
+    """
+    if method not in ["average", "additive"]:
+        raise ValueError(
+            f"Invalid method: {method}. Choose 'average' or 'additive' for chunked embeddings."
+        )
+    if n_jobs != 1 and not isinstance(model, str):
+        raise ValueError(
+            "Parallel embeddings need the path of a model snapshot, see snapshot_model"
+        )
+
+    # Opening a snapshot only maps the vectors, so this is cheap even when workers do the job
+    snapshot_path = model if isinstance(model, str) else None
+    if isinstance(model, str):
+        model = gensim.models.KeyedVectors.load(model, mmap="r")
+    vector_size = model.vector_size
+
+    n_docs = len(preprocessed_texts)
+    shape = (n_docs, vector_size)
+    print(f"Processing {n_docs} documents in chunks of {chunk_size}...")
+
+    # Preallocate the output, in memory or as a .npy file save_embeddings could have written
+    if output_path is None:
+        embeddings = np.empty(shape, dtype=dtype)
+    else:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "wb") as f:
+            _write_npy_header(f, np.dtype(dtype), shape)
+            f.truncate(NPY_HEADER_SIZE + n_docs * vector_size * np.dtype(dtype).itemsize)
+        embeddings = np.memmap(
+            output_path, dtype=dtype, mode="r+", offset=NPY_HEADER_SIZE, shape=shape
+        )
+
+    texts_iter = iter(preprocessed_texts)
+    chunks = iter(lambda: list(islice(texts_iter, chunk_size)), [])
+
+    if n_jobs == 1:
+        start = 0
+        for chunk in chunks:
+            embeddings[start : start + len(chunk)] = _embed_chunk(chunk, model, method)  # type: ignore
+            start += len(chunk)
+    else:
+        max_workers = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(snapshot_path,)
+        ) as executor:
+            # Bound the number of chunks in flight, so memory does not grow with the corpus
+            pending: deque = deque()
+            start = 0
+            for chunk in chunks:
+                pending.append((start, executor.submit(_embed_chunk_worker, chunk, method)))
+                start += len(chunk)
+                if len(pending) >= 2 * max_workers:
+                    chunk_start, future = pending.popleft()
+                    result = future.result()
+                    embeddings[chunk_start : chunk_start + len(result)] = result
+            while pending:
+                chunk_start, future = pending.popleft()
+                result = future.result()
+                embeddings[chunk_start : chunk_start + len(result)] = result
+
+    if isinstance(embeddings, np.memmap):
+        embeddings.flush()
+        print(f"Embeddings saved at: {output_path}")
+    return embeddings
+
+
+# Fixed size of the .npy header written by save_embeddings(compressed=False). It leaves
+# room for the row count to grow, so append_embeddings can update it in place.
+NPY_HEADER_SIZE = 128
+
+
+def _write_npy_header(f, dtype: np.dtype, shape: tuple[int, ...]) -> None:
+    """Write a version 1.0 .npy header padded to NPY_HEADER_SIZE bytes."""
+    header = repr(
+        {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": tuple(int(dim) for dim in shape),
+        }
+    )
+    # Magic string (6 bytes) + version (2 bytes) + header length (2 bytes)
+    header_len = NPY_HEADER_SIZE - 10
+    if len(header) + 1 > header_len:
+        raise ValueError(f"Cannot fit the .npy header of an array of shape {shape}")
+
+    f.write(np.lib.format.magic(1, 0))
+    f.write(struct.pack("<H", header_len))
+    f.write(header.ljust(header_len - 1).encode("latin1") + b"\n")
+
+
+def save_embeddings(
+    embeddings: np.ndarray,
+    filepath: str,
+    compressed: bool = True,
+    dtype: Optional[Union[str, np.dtype]] = None,
+) -> None:
     """Save embeddings to a file.
 
     Parameters
@@ -130,29 +482,91 @@ def save_embeddings(embeddings: np.ndarray, filepath: str) -> None:
     embeddings : np.ndarray
         2D array with embeddings to save
     filepath : str, optional
-        Path to save the file, by default "data/ESM"
+        Path to save the file, without extension, by default "data/ESM"
+    compressed : bool, optional
+        If True, save a compressed ``{filepath}.npz``. If False, save a raw
+        ``{filepath}.npy`` that ``load_embeddings`` can memory-map and
+        ``append_embeddings`` can extend, by default True
+    dtype : Optional[Union[str, np.dtype]], optional
+        Data type to cast the embeddings to before saving (e.g. "float32" or
+        "float16"), by default None (keep the current type)
     """
     # Create directory if it does not exist
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
+    if dtype is not None:
+        embeddings = embeddings.astype(dtype, copy=False)
+
     # Save embeddings
-    np.savez_compressed(f"{filepath}.npz", embeddings=embeddings)
+    if compressed:
+        np.savez_compressed(f"{filepath}.npz", embeddings=embeddings)
+    else:
+        embeddings = np.ascontiguousarray(embeddings)
+        with open(f"{filepath}.npy", "wb") as f:
+            _write_npy_header(f, embeddings.dtype, embeddings.shape)
+            embeddings.tofile(f)
     print(f"Embeddings saved at: {filepath}")
 
 
-def load_embeddings(filepath: str):
-    """Load embeddings from a .npz file.
+def append_embeddings(embeddings: np.ndarray, filepath: str) -> None:
+    """Append rows to a .npy file written by ``save_embeddings(compressed=False)``.
+
+    The new rows are written at the end of the file and the row count in the header
+    is updated in place, so the existing rows are never rewritten.
+
+    Parameters
+    ----------
+    embeddings : np.ndarray
+        2D array with the embeddings to append; cast to the dtype of the file
+    filepath : str
+        Path to the .npy file
+    """
+    with open(filepath, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+        if f.tell() != NPY_HEADER_SIZE or fortran_order or len(shape) != 2:
+            raise ValueError(
+                f"{filepath} was not written by save_embeddings(compressed=False), "
+                "its header cannot be updated in place"
+            )
+        if embeddings.ndim != 2 or embeddings.shape[1] != shape[1]:
+            raise ValueError(
+                f"Cannot append embeddings of shape {embeddings.shape} to a file of shape {shape}"
+            )
+
+        rows = np.ascontiguousarray(embeddings, dtype=dtype)
+        # Data first, then the header, so an interrupted append leaves a valid file
+        f.seek(NPY_HEADER_SIZE + shape[0] * shape[1] * dtype.itemsize)
+        rows.tofile(f)
+        f.truncate()
+        f.seek(0)
+        _write_npy_header(f, dtype, (shape[0] + rows.shape[0], shape[1]))
+
+
+def load_embeddings(filepath: str, mmap_mode: Optional[str] = None):
+    """Load embeddings from a .npz or .npy file.
 
     Parameters
     ----------
     filepath : str
         Path to the file containing the embeddings
+    mmap_mode : Optional[str], optional
+        Memory-map mode for .npy files (e.g. "r"), so that the embeddings are read
+        lazily from the page cache and shared between processes instead of copied.
+        Ignored for .npz files. By default None
 
     Returns
     -------
     np.ndarray
         Array with the loaded embeddings
     """
+    if filepath.endswith(".npy"):
+        return np.load(filepath, mmap_mode=mmap_mode)
+
     data = np.load(filepath)
     return data["embeddings"]
 
@@ -171,6 +585,8 @@ if __name__ == "__main__":
     # Example usage
     sem_average = create_sentence_embeddings(texts, model, method="average")
     sem_additive = create_sentence_embeddings(texts, model, method="additive")
+    sem_tfidf = create_sentence_embeddings(texts, model, method="tfidf")
+    sem_sif = create_sentence_embeddings(texts, model, method="sif")
 
     print("Semantic Average Vectors:")
     print(sem_average)
@@ -179,3 +595,6 @@ if __name__ == "__main__":
     print("\nSemantic Additive Vectors:")
     print(sem_additive)
     print("Semantic Additive shape:", sem_additive.shape)
+
+    print("\nSemantic TF-IDF shape:", sem_tfidf.shape)
+    print("Semantic SIF shape:", sem_sif.shape)
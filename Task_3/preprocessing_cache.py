@@ -0,0 +1,140 @@
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable
+
+import spacy
+
+
+# SQLite limits the number of parameters of a statement
+_QUERY_BATCH_SIZE = 900
+
+
+def model_fingerprint(model: str) -> str:
+    """Identify a spaCy model and its version without loading it.
+
+    Parameters
+    ----------
+    model : str
+        Name of an installed spaCy model package, or path to a model directory.
+
+    Returns
+    -------
+    str
+        "<model>@<version>" ("<lang>_<name>@<version>" for a model directory), with an
+        empty version if it cannot be determined.
+    """
+    meta_path = Path(model) / "meta.json"
+    if meta_path.exists():
+        meta = spacy.util.load_meta(meta_path)
+        return f"{meta.get('lang', '')}_{meta.get('name', model)}@{meta.get('version', '')}"
+    return f"{model}@{spacy.util.get_package_version(model) or ''}"
+
+
+class PreprocessingCache:
+    """On-disk key/value store of preprocessed texts, backed by SQLite.
+
+    Keys are content addresses: the hash of the raw text together with the spaCy
+    model fingerprint and the ``lemmatize`` flag, so a text is only parsed again if
+    it, the model or the preprocessing options change. The store is bounded to
+    ``max_size_bytes`` of preprocessed text; the least recently used entries are
+    evicted first.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite file, created if it does not exist.
+    max_size_bytes : int, optional
+        Maximum total size of the cached values, by default 1 GiB
+    """
+
+    def __init__(self, path: str, max_size_bytes: int = 1 << 30):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key BLOB PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model_id: str, lemmatize: bool) -> bytes:
+        """Content address of a text preprocessed with a given model and options."""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{model_id}\0{int(lemmatize)}\0".encode())
+        digest.update(text.encode("utf-8", errors="surrogatepass"))
+        return digest.digest()
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, str]:
+        """Return the cached values of the given keys that are present in the store."""
+        found: dict[bytes, str] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), _QUERY_BATCH_SIZE):
+            batch = unique_keys[start : start + _QUERY_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch
+            )
+            found.update(rows)
+
+        # Refresh the recency of the hits for the LRU eviction
+        now = time.time()
+        self._conn.executemany(
+            "UPDATE entries SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+        )
+        self._conn.commit()
+        return found
+
+    def put_many(self, items: Iterable[tuple[bytes, str]]) -> None:
+        """Store (key, value) pairs, replacing existing entries."""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+            [(key, value, len(value.encode("utf-8")), now) for key, value in items],
+        )
+        self._conn.commit()
+
+    def size_bytes(self) -> int:
+        """Total size of the cached values."""
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self) -> int:
+        """Drop the least recently used entries until the store fits in ``max_size_bytes``.
+
+        Returns
+        -------
+        int
+            Number of evicted entries.
+        """
+        excess = self.size_bytes() - self.max_size_bytes
+        if excess <= 0:
+            return 0
+
+        evicted = []
+        cursor = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access")
+        for key, size in cursor:
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        cursor.close()
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._conn.commit()
+        return len(evicted)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "PreprocessingCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
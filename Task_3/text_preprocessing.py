@@ -1,10 +1,27 @@
+import os
 import re
-from typing import Iterable, Union
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator, NamedTuple, Optional, Sized, Union
 
 import pandas as pd
-import spacy
+from preprocessing_cache import PreprocessingCache, model_fingerprint
+from spacy.attrs import LEMMA, LOWER, ORTH
 from tqdm import tqdm
 
+from text_mining.spacy_models import LEMMATIZER_COMPONENTS, TOKENIZER_COMPONENTS, load_spacy_model
+
+
+# Header field line: any word followed by a colon ("From:", "Subject:", "Lines:", ...)
+HEADER_FIELD_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9\-_]*:")
+# Attribution line of a quoted reply ("john@example.com (John) writes:")
+WRITES_PATTERN = re.compile(r"\S+.*writes:\s*$")
+EXCESSIVE_NEWLINES_PATTERN = re.compile(r"\n\s*\n\s*\n")
+# Number of lines before a blank line searched for header fields
+HEADER_WINDOW = 5
+# Usenet signature delimiter ("-- " on its own line)
+SIGNATURE_DELIMITER = "--"
+
 
 def clean_header(content: str) -> str:
     """Remove newsgroup headers from the content.
@@ -30,9 +47,9 @@ def clean_header(content: str) -> str:
             # Look for the end of header (empty line after header fields)
             if line.strip() == "" and i > 0:
                 # Check if previous lines contain header fields (any word followed by colon)
-                prev_lines = lines[max(0, i - 5) : i]
+                prev_lines = lines[max(0, i - HEADER_WINDOW) : i]
                 has_header_fields = any(
-                    re.match(r"^[A-Za-z][A-Za-z0-9\-_]*:", line.strip()) for line in prev_lines
+                    HEADER_FIELD_PATTERN.match(line.strip()) for line in prev_lines
                 )
                 if has_header_fields:
                     content_start = i + 1
@@ -44,7 +61,7 @@ def clean_header(content: str) -> str:
 
     # Join lines and clean up extra whitespace
     cleaned_content = "\n".join(content_lines)
-    cleaned_content = re.sub(r"\n\s*\n\s*\n", "\n\n", cleaned_content)  # Remove excessive newlines
+    cleaned_content = EXCESSIVE_NEWLINES_PATTERN.sub("\n\n", cleaned_content)
 
     return cleaned_content.strip()
 
@@ -63,16 +80,340 @@ def remove_writes_lines(content: str) -> str:
         The cleaned content without 'writes:' lines and leading empty lines.
     """
     lines = content.split("\n")
-    cleaned_lines = [line for line in lines if not re.search(r"\S+.*writes:\s*$", line.strip())]
+    cleaned_lines = [line for line in lines if not WRITES_PATTERN.search(line.strip())]
     # Remove leading empty lines
     while cleaned_lines and cleaned_lines[0].strip() == "":
         cleaned_lines.pop(0)
     return "\n".join(cleaned_lines)
 
 
+def _signature_start(lines: list[str]) -> int:
+    """Index of the last signature delimiter line, or len(lines) if there is none."""
+    for i in range(len(lines) - 1, -1, -1):
+        if lines[i].rstrip() == SIGNATURE_DELIMITER:
+            return i
+    return len(lines)
+
+
 def remove_firm(content: str) -> str:
-    # TODO
-    return ""
+    """Remove the signature (firma) at the end of a newsgroup message.
+
+    The signature is everything from the last "-- " delimiter line to the end.
+
+    Parameters
+    ----------
+    content : str
+        The newsgroup content.
+
+    Returns
+    -------
+    str
+        The content without its signature, or unchanged if it has none.
+    """
+    lines = content.split("\n")
+    return "\n".join(lines[: _signature_start(lines)])
+
+
+def clean_content(content: str, remove_signature: bool = False) -> str:
+    """Clean a raw newsgroup message in a single pass over its lines.
+
+    Equivalent to ``remove_writes_lines(clean_header(content))``: the header is
+    dropped, runs of two or more blank lines are collapsed into one empty line, the
+    text is stripped, and 'writes:' attribution lines and leading empty lines are
+    removed. Optionally the signature is stripped too, as in ``remove_firm``.
+
+    Parameters
+    ----------
+    content : str
+        The raw newsgroup content.
+    remove_signature : bool, optional
+        Whether to remove the signature at the end of the message, by default False
+
+    Returns
+    -------
+    str
+        The cleaned content.
+    """
+    lines = content.split("\n")
+
+    # Header: first blank line (not the first line) with a header field in the
+    # HEADER_WINDOW lines before it
+    content_start = 0
+    last_field = -HEADER_WINDOW - 1
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped:
+            if i > 0 and i - last_field <= HEADER_WINDOW:
+                content_start = i + 1
+                break
+        elif HEADER_FIELD_PATTERN.match(stripped):
+            last_field = i
+
+    content_end = len(lines)
+    if remove_signature:
+        content_end = content_start + _signature_start(lines[content_start:])
+
+    cleaned_lines = []
+    blank_run = []  # Blank lines seen since the last non-blank line
+    seen_text = False
+    last_kept = False
+    for i in range(content_start, content_end):
+        line = lines[i]
+        stripped = line.strip()
+        if not stripped:
+            blank_run.append(line)
+            continue
+
+        if not seen_text:
+            # Leading blank lines and indentation are stripped
+            line = line.lstrip()
+            seen_text = True
+        elif blank_run and cleaned_lines:
+            # Two or more blank lines collapse into one empty line; blank lines at the
+            # start of the result are dropped
+            if len(blank_run) >= 2:
+                cleaned_lines.append("")
+            else:
+                cleaned_lines.extend(blank_run)
+        blank_run = []
+
+        # Cheap suffix test first: the pattern can only match lines ending in "writes:"
+        last_kept = not (stripped.endswith("writes:") and WRITES_PATTERN.search(stripped))
+        if last_kept:
+            cleaned_lines.append(line)
+
+    # Trailing blank lines are stripped along with the last line's trailing whitespace
+    if last_kept:
+        cleaned_lines[-1] = cleaned_lines[-1].rstrip()
+
+    return "\n".join(cleaned_lines)
+
+
+def clean_corpus(
+    contents: Union[pd.Series, Iterable[str]],
+    remove_signature: bool = False,
+    n_jobs: int = 1,
+    chunksize: int = 1000,
+) -> Union[pd.Series, list[str]]:
+    """Clean many raw newsgroup messages with ``clean_content``.
+
+    Parameters
+    ----------
+    contents : Union[pd.Series, Iterable[str]]
+        The raw newsgroup contents.
+    remove_signature : bool, optional
+        Whether to remove the signature at the end of each message, by default False
+    n_jobs : int, optional
+        Number of worker processes; 1 cleans in the current process and -1 uses all
+        cores, by default 1
+    chunksize : int, optional
+        Number of documents sent to a worker process at once, by default 1000
+
+    Returns
+    -------
+    Union[pd.Series, list[str]]
+        The cleaned contents, as a Series with the same index if a Series was given,
+        or as a list otherwise.
+    """
+    clean = partial(clean_content, remove_signature=remove_signature)
+
+    if n_jobs == 1:
+        cleaned = [clean(content) for content in contents]
+    else:
+        with ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs) as executor:
+            cleaned = list(executor.map(clean, contents, chunksize=chunksize))
+
+    if isinstance(contents, pd.Series):
+        return pd.Series(cleaned, index=contents.index, name=contents.name)
+    return cleaned
+
+
+def _load_nlp(model: str, lemmatize: bool):
+    """Get the cached spaCy pipeline with only the components preprocessing needs."""
+    return load_spacy_model(model, LEMMATIZER_COMPONENTS if lemmatize else TOKENIZER_COMPONENTS)
+
+
+# Maximum number of entries of a token cache before it is cleared
+TOKEN_CACHE_SIZE = 1 << 20
+
+
+class _TokenCache(NamedTuple):
+    """Per-run token filter results, freed with the run that fills them."""
+
+    keep: dict[int, bool]  # Keep/drop decision of each orth id
+    lowered: dict[int, str]  # Lowercased string of each lemma/lower id
+
+
+def _keep_lexeme(lexeme) -> bool:
+    """Whether tokens of this lexeme are kept by the preprocessing filter."""
+    text = lexeme.orth_
+    return (
+        not lexeme.is_punct
+        and not lexeme.is_space
+        and text.strip() != ""  # Exclude empty tokens or tokens consisting only of spaces
+        and not re.match(r"^[\s\t\n\r]+$", text)  # Exclude tokens that are only whitespace
+        and not re.match(
+            r"^[^\w\s]+$", text
+        )  # Exclude tokens that are only symbols (|, >, ^^^, etc.)
+        and len(text.strip()) > 0  # Ensure there is real content
+    )
+
+
+def _process_tokens(doc, lemmatize: bool, token_cache: Optional[_TokenCache] = None) -> str:
+    """Extract and filter tokens from a spaCy doc.
+
+    The filter only depends on lexical attributes, so it is evaluated once per lexeme
+    and stored in ``token_cache``; each document is then read as an array of (orth,
+    lemma/lower) ids. The cache is cleared once it holds ``TOKEN_CACHE_SIZE`` entries.
+    """
+    if token_cache is None:
+        token_cache = _TokenCache({}, {})
+    elif len(token_cache.keep) + len(token_cache.lowered) >= TOKEN_CACHE_SIZE:
+        token_cache.keep.clear()
+        token_cache.lowered.clear()
+    keep_lexeme, lowered_ids = token_cache
+    vocab = doc.vocab
+    strings = vocab.strings
+
+    tokens = []
+    for orth, out_id in doc.to_array([ORTH, LEMMA if lemmatize else LOWER]).tolist():
+        keep = keep_lexeme.get(orth)
+        if keep is None:
+            keep = keep_lexeme[orth] = _keep_lexeme(vocab[orth])
+        if keep:
+            lowered = lowered_ids.get(out_id)
+            if lowered is None:
+                lowered = lowered_ids[out_id] = strings[out_id].lower()
+            tokens.append(lowered)
+    return " ".join(tokens)
+
+
+def preprocessing_stream(
+    content: Iterable[str],
+    model: str = "en_core_web_sm",
+    lemmatize: bool = True,
+    batch_size: int = 1000,
+    n_process: int = 1,
+    output_path: Optional[str] = None,
+    chunk_size: int = 10000,
+) -> Iterator[str]:
+    """Preprocess an iterable of texts lazily, yielding the results in input order.
+
+    Documents are pulled from ``content`` as spaCy needs them, so generators and other
+    unsized iterables can be processed with bounded memory. If ``output_path`` is given,
+    results are also appended to that file in chunks of ``chunk_size`` documents, one
+    preprocessed document per line.
+
+    Parameters
+    ----------
+    content : Iterable[str]
+        The raw texts to preprocess. Can be any iterable, including a generator.
+    model : str, optional
+        The spaCy model to use for tokenization and lemmatization, by default "en_core_web_sm"
+    lemmatize : bool, optional
+        Whether to apply lemmatization to the tokens, by default True
+    batch_size : int, optional
+        Number of documents buffered by spaCy per batch, by default 1000
+    n_process : int, optional
+        Number of processes used by spaCy to parse the documents (-1 for all cores),
+        by default 1
+    output_path : Optional[str], optional
+        File where the preprocessed documents are written, by default None
+    chunk_size : int, optional
+        Number of documents written to ``output_path`` at once, by default 10000
+
+    Yields
+    ------
+    str
+        The preprocessed text of each document, in the same order as ``content``.
+    """
+    nlp = _load_nlp(model, lemmatize)
+
+    docs = tqdm(
+        nlp.pipe(content, batch_size=batch_size, n_process=n_process),
+        total=len(content) if isinstance(content, Sized) else None,
+        desc="Processing documents...",
+    )
+
+    # Token outputs of this run, freed with it
+    token_cache = _TokenCache({}, {})
+
+    if output_path is None:
+        for doc in docs:
+            yield _process_tokens(doc, lemmatize, token_cache)
+        return
+
+    # Create directories if they do not exist
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        chunk = []
+        try:
+            for doc in docs:
+                processed = _process_tokens(doc, lemmatize, token_cache)
+                chunk.append(processed)
+                if len(chunk) == chunk_size:
+                    f.write("\n".join(chunk) + "\n")
+                    f.flush()
+                    chunk = []
+                yield processed
+        finally:
+            # Persist whatever was processed, even if the consumer stops early
+            if chunk:
+                f.write("\n".join(chunk) + "\n")
+
+
+def read_preprocessed(filepath: str) -> Iterator[str]:
+    """Lazily read the documents written by ``preprocessing_stream``.
+
+    Parameters
+    ----------
+    filepath : str
+        The file written through the ``output_path`` argument of ``preprocessing_stream``.
+
+    Yields
+    ------
+    str
+        One preprocessed document per line, in the original order.
+    """
+    with open(filepath, encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def _cached_preprocessing(
+    texts: list[str],
+    model: str,
+    lemmatize: bool,
+    batch_size: int,
+    n_process: int,
+    cache_path: str,
+    cache_max_bytes: int,
+) -> list[str]:
+    """Preprocess texts, parsing only those missing from the on-disk cache."""
+    with PreprocessingCache(cache_path, max_size_bytes=cache_max_bytes) as cache:
+        model_id = model_fingerprint(model)
+        keys = [cache.make_key(text, model_id, lemmatize) for text in texts]
+        hits = cache.get_many(keys)
+
+        results: list[Optional[str]] = [hits.get(key) for key in keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        print(f"Preprocessing cache: {len(texts) - len(misses)} hits, {len(misses)} misses")
+
+        if misses:
+            processed = preprocessing_stream(
+                (texts[i] for i in misses),
+                model=model,
+                lemmatize=lemmatize,
+                batch_size=batch_size,
+                n_process=n_process,
+            )
+            for i, result in zip(misses, processed):
+                results[i] = result
+            cache.put_many((keys[i], results[i]) for i in misses)  # type: ignore
+            cache.evict()
+
+    return results  # type: ignore
 
 
 def preprocessing_pipeline(
@@ -80,6 +421,9 @@ def preprocessing_pipeline(
     model: str = "en_core_web_sm",
     lemmatize: bool = True,
     batch_size: int = 1000,
+    n_process: int = 1,
+    cache_path: Optional[str] = None,
+    cache_max_bytes: int = 1 << 30,
 ):
     """Preprocess the text content in batch or individual mode.
 
@@ -93,6 +437,14 @@ def preprocessing_pipeline(
         Whether to apply lemmatization to the tokens, by default True
     batch_size : int, optional
         Batch size for processing when content is a list, by default 1000
+    n_process : int, optional
+        Number of processes used by spaCy when content is a list, by default 1
+    cache_path : Optional[str], optional
+        SQLite file caching the preprocessed texts by (text hash, model and version,
+        lemmatize); only texts missing from it are parsed. By default None (no cache)
+    cache_max_bytes : int, optional
+        Maximum size of the cached texts, least recently used ones are evicted first,
+        by default 1 GiB
 
     Returns
     -------
@@ -100,43 +452,32 @@ def preprocessing_pipeline(
         The preprocessed text. Returns a string if input was a string,
         or a list of strings if input was a list.
     """
-    # Carga el modelo de spaCy en inglés
-    nlp = spacy.load(model)
-
-    def process_tokens(doc):
-        """Extract and filter tokens from a spaCy doc."""
-        tokens = [
-            token.lemma_.lower() if lemmatize else token.text.lower()
-            for token in doc
-            if not token.is_punct
-            and not token.is_space
-            and token.text.strip() != ""  # Exclude empty tokens or tokens consisting only of spaces
-            and not re.match(
-                r"^[\s\t\n\r]+$", token.text
-            )  # Exclude tokens that are only whitespace
-            and not re.match(
-                r"^[^\w\s]+$", token.text
-            )  # Exclude tokens that are only symbols (|, >, ^^^, etc.)
-            and len(token.text.strip()) > 0  # Ensure there is real content
-        ]
-        return " ".join(tokens)
+    if cache_path is not None and isinstance(content, (str, list, tuple, pd.Series)):
+        texts = [content] if isinstance(content, str) else list(content)
+        results = _cached_preprocessing(
+            texts, model, lemmatize, batch_size, n_process, cache_path, cache_max_bytes
+        )
+        return results[0] if isinstance(content, str) else results
 
     # Handle single string input (backward compatibility)
     if isinstance(content, str):
+        # Carga el modelo de spaCy en inglés
+        nlp = _load_nlp(model, lemmatize)
         doc = nlp(content)
-        return process_tokens(doc)
+        return _process_tokens(doc, lemmatize)
 
     # Handle batch processing for list input
     elif isinstance(content, (list, tuple, pd.Series)):
         # Use nlp.pipe for efficient batch processing
-        processed_texts = []
-        for doc in tqdm(
-            nlp.pipe(content, batch_size=batch_size),
-            total=len(content),
-            desc="Processing documents...",
-        ):
-            processed_texts.append(process_tokens(doc))
-        return processed_texts
+        return list(
+            preprocessing_stream(
+                content,
+                model=model,
+                lemmatize=lemmatize,
+                batch_size=batch_size,
+                n_process=n_process,
+            )
+        )
 
     else:
         raise ValueError("Content must be either a string or a list/tuple of strings")
@@ -148,9 +489,7 @@ if __name__ == "__main__":
     # Try to load the corpus data if it exists
     try:
         corpus_raw_df = pd.read_csv("Task_3/data/corpus_raw.csv")
-        corpus_raw_df["cleaned_content"] = (
-            corpus_raw_df["content"].apply(clean_header).apply(remove_writes_lines)
-        )
+        corpus_raw_df["cleaned_content"] = clean_corpus(corpus_raw_df["content"])
         print("DataFrame info:")
         print(corpus_raw_df.head())
     except FileNotFoundError:
@@ -1,53 +1,120 @@
-from pathlib import Path
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator, Optional
 
 import pandas as pd
 
 
-def build_corpus_dataframe(corpus_path: str) -> pd.DataFrame:
+CORPUS_COLUMNS = ["category", "document_id", "content", "file_path"]
+
+# Number of files read by each thread-pool task, to amortize the scheduling overhead
+READ_BATCH_SIZE = 64
+
+
+def scan_corpus(corpus_path: str) -> Iterator[tuple[str, str, str]]:
+    """Yield (category, document_id, file_path) for every document of the corpus."""
+    # Iterate through each category folder
+    with os.scandir(corpus_path) as category_entries:
+        for category_entry in category_entries:
+            if category_entry.is_dir() and not category_entry.name.startswith("."):
+                # Iterate through each document in the category
+                with os.scandir(category_entry.path) as doc_entries:
+                    for doc_entry in doc_entries:
+                        if doc_entry.is_file() and not doc_entry.name.startswith("."):
+                            yield category_entry.name, doc_entry.name, doc_entry.path
+
+
+def _read_document(file_path: str) -> Optional[str]:
+    """Read a document, returning None if it cannot be read."""
+    try:
+        with open(file_path, encoding="utf-8", errors="ignore") as f:
+            return f.read()
+    except Exception as e:
+        print(f"Error reading file {file_path}: {e}")
+        return None
+
+
+def read_documents(file_paths: list[str], max_workers: Optional[int] = None) -> list[Optional[str]]:
+    """Read documents concurrently in batches, keeping the input order."""
+    batches = [
+        file_paths[i : i + READ_BATCH_SIZE] for i in range(0, len(file_paths), READ_BATCH_SIZE)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return [
+            content
+            for batch in executor.map(lambda paths: [_read_document(p) for p in paths], batches)
+            for content in batch
+        ]
+
+
+def _build_frame(
+    entries: list[tuple[str, str, str]], contents: list[Optional[str]]
+) -> pd.DataFrame:
+    """Build the corpus DataFrame column by column, skipping unreadable documents."""
+    keep = [i for i, content in enumerate(contents) if content is not None]
+    return pd.DataFrame(
+        {
+            "category": pd.Categorical([entries[i][0] for i in keep]),
+            "document_id": [entries[i][1] for i in keep],
+            "content": [contents[i] for i in keep],
+            "file_path": [entries[i][2] for i in keep],
+        },
+        columns=CORPUS_COLUMNS,
+    )
+
+
+def build_corpus_dataframe(corpus_path: str, max_workers: Optional[int] = None) -> pd.DataFrame:
     """
     Build a DataFrame where each row represents a document from the corpus.
 
+    Directories are scanned with ``os.scandir`` and the documents are read concurrently
+    by a thread pool, so the load is not bound by the latency of each file access.
+
     Parameters
     ----------
     corpus_path : str
         Path to the corpus directory
+    max_workers : Optional[int], optional
+        Number of threads reading files, by default None (ThreadPoolExecutor default)
 
     Returns
     -------
     pd.DataFrame
-        DataFrame with columns ['category', 'document_id', 'content', 'file_path']
+        DataFrame with columns ['category', 'document_id', 'content', 'file_path'],
+        where 'category' is categorical
     """
-    data = []
+    entries = list(scan_corpus(corpus_path))
 
-    # Get the corpus directory
-    corpus_dir = Path(corpus_path)
+    contents = read_documents([entry[2] for entry in entries], max_workers)
 
-    # Iterate through each category folder
-    for category_folder in corpus_dir.iterdir():
-        if category_folder.is_dir() and not category_folder.name.startswith("."):
-            category = category_folder.name
-            # print(f"Processing category: {category}")
-
-            # Iterate through each document in the category
-            for doc_file in category_folder.iterdir():
-                if doc_file.is_file() and not doc_file.name.startswith("."):
-                    try:
-                        # Read the document content
-                        with open(doc_file, encoding="utf-8", errors="ignore") as f:
-                            content = f.read()
-
-                        # Add document data to list
-                        data.append(
-                            {
-                                "category": category,
-                                "document_id": doc_file.name,
-                                "content": content,
-                            }
-                        )
-
-                    except Exception as e:
-                        print(f"Error reading file {doc_file}: {e}")
-
-    # Create DataFrame
-    df = pd.DataFrame(data)
-    return df
+    return _build_frame(entries, contents)
+
+
+def iter_corpus_chunks(
+    corpus_path: str, chunk_size: int = 5000, max_workers: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Lazily load the corpus as DataFrame chunks of at most ``chunk_size`` documents.
+
+    Only one chunk of document contents is held in memory at a time.
+
+    Parameters
+    ----------
+    corpus_path : str
+        Path to the corpus directory
+    chunk_size : int, optional
+        Maximum number of documents per chunk, by default 5000
+    max_workers : Optional[int], optional
+        Number of threads reading files, by default None (ThreadPoolExecutor default)
+
+    Yields
+    ------
+    pd.DataFrame
+        Chunks with the same columns as ``build_corpus_dataframe``
+    """
+    entries_iter = scan_corpus(corpus_path)
+
+    while entries := list(islice(entries_iter, chunk_size)):
+        contents = read_documents([entry[2] for entry in entries], max_workers)
+        yield _build_frame(entries, contents)
@@ -1,54 +1,251 @@
 import json
-from typing import Iterable, Union
+from itertools import islice
+from typing import Iterable, Optional, Union
 
+import numpy as np
 import pandas as pd
 from scipy import sparse
 from scipy.sparse._csr import csr_matrix
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer, TfidfVectorizer
 from sklearn.preprocessing import normalize
 
 
+VECTORIZATION_METHODS = ("bow", "tfidf")
+HASHING_METHODS = ("hashing", "hashing_tfidf")
+
+
+class TextVectorizer:
+    """Vectorizer fitted once on a corpus and reused to project new documents.
+
+    It wraps a ``CountVectorizer`` (``"bow"``) or a ``TfidfVectorizer`` (``"tfidf"``).
+    The fitted state (vocabulary, IDF weights and normalization settings) can be saved
+    to a compact ``.npz`` file and reloaded, so that new documents are transformed into
+    the same feature space without refitting on the whole corpus.
+
+    Parameters
+    ----------
+    method : str, optional
+        The vectorization method to use, by default "bow"
+    apply_l2_norm : bool, optional
+        Whether to apply L2 normalization to the BoW vectors, by default True.
+        TF-IDF vectors are always L2-normalized.
+    """
+
+    def __init__(self, method: str = "bow", apply_l2_norm: bool = True):
+        if method not in VECTORIZATION_METHODS:
+            raise ValueError(
+                f"Unsupported vectorization method: {method}. "
+                "Available methods are: 'bow', 'tfidf'."
+            )
+        self.method = method
+        self.apply_l2_norm = apply_l2_norm
+        self._vectorizer: Optional[Union[CountVectorizer, TfidfVectorizer]] = None
+
+    def _build_vectorizer(self, vocabulary: Optional[list[str]] = None):
+        if self.method == "bow":
+            # Create the CountVectorizer object
+            return CountVectorizer(vocabulary=vocabulary)
+        # Create the TfidfVectorizer object
+        return TfidfVectorizer(norm="l2", vocabulary=vocabulary)
+
+    def _postprocess(self, X: csr_matrix) -> csr_matrix:
+        # Apply L2 normalization if requested
+        if self.apply_l2_norm and self.method == "bow":
+            X = normalize(X, norm="l2")
+        return X
+
+    def fit(self, text: Union[list[str], pd.Series, Iterable[str]]) -> "TextVectorizer":
+        """Learn the vocabulary (and IDF weights) from the given texts."""
+        self._vectorizer = self._build_vectorizer()
+        self._vectorizer.fit(text)
+        return self
+
+    def fit_transform(self, text: Union[list[str], pd.Series, Iterable[str]]) -> csr_matrix:
+        """Fit the vectorizer and return the vectors of the given texts."""
+        self._vectorizer = self._build_vectorizer()
+        return self._postprocess(self._vectorizer.fit_transform(text))
+
+    def transform(self, text: Union[list[str], pd.Series, Iterable[str]]) -> csr_matrix:
+        """Project texts into the fitted feature space.
+
+        Words that were not seen during fit are ignored.
+        """
+        if self._vectorizer is None:
+            raise ValueError("The vectorizer is not fitted. Call fit or load first.")
+        return self._postprocess(self._vectorizer.transform(text))
+
+    @property
+    def vocabulary(self) -> dict[str, int]:
+        """Mapping of words to their feature indices."""
+        if self._vectorizer is None:
+            raise ValueError("The vectorizer is not fitted. Call fit or load first.")
+        return self._vectorizer.vocabulary_
+
+    @property
+    def idf(self) -> Optional[np.ndarray]:
+        """IDF weights of each feature, or None for the BoW method."""
+        if self._vectorizer is None:
+            raise ValueError("The vectorizer is not fitted. Call fit or load first.")
+        return self._vectorizer.idf_ if self.method == "tfidf" else None
+
+    def save(self, filepath: str) -> None:
+        """Save the fitted state to ``{filepath}_vectorizer.npz``.
+
+        The vocabulary is stored as a single UTF-8 blob of newline-separated words,
+        ordered by feature index, next to the IDF array and the normalization settings.
+
+        Parameters
+        ----------
+        filepath : str
+            The file path prefix, as in ``save_vectors_scipy``.
+        """
+        import os
+
+        if self._vectorizer is None:
+            raise ValueError("The vectorizer is not fitted. Call fit or load first.")
+
+        # Create directories if they do not exist
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+
+        # Words never contain a newline (default token pattern), so it is a safe separator
+        terms = "\n".join(self._vectorizer.get_feature_names_out())
+        idf = self.idf
+        np.savez(
+            f"{filepath}_vectorizer.npz",
+            method=np.array(self.method),
+            apply_l2_norm=np.array(self.apply_l2_norm),
+            terms=np.frombuffer(terms.encode("utf-8"), dtype=np.uint8),
+            idf=idf if idf is not None else np.empty(0),
+        )
+        print(f"Vectorizer saved to {filepath}_vectorizer.npz")
+
+    @classmethod
+    def load(cls, filepath: str) -> "TextVectorizer":
+        """Load a vectorizer saved with ``save``.
+
+        Parameters
+        ----------
+        filepath : str
+            The file path prefix used when saving.
+
+        Returns
+        -------
+        TextVectorizer
+            The fitted vectorizer, ready to transform new texts.
+        """
+        with np.load(f"{filepath}_vectorizer.npz") as data:
+            vectorizer = cls(method=str(data["method"]), apply_l2_norm=bool(data["apply_l2_norm"]))
+            terms_blob = data["terms"].tobytes().decode("utf-8")
+            idf = data["idf"]
+
+        terms = terms_blob.split("\n") if terms_blob else []
+        vectorizer._vectorizer = vectorizer._build_vectorizer(vocabulary=terms)
+        # Restore the fitted vocabulary as fit would, rather than on the first transform
+        vectorizer._vectorizer.vocabulary_ = {term: i for i, term in enumerate(terms)}
+        vectorizer._vectorizer.fixed_vocabulary_ = True
+        if vectorizer.method == "tfidf":
+            # With a fixed vocabulary, the IDF weights are all the TF-IDF fit would learn
+            vectorizer._vectorizer.idf_ = idf
+        return vectorizer
+
+
+def _hashing_vectorize(
+    text: Iterable[str],
+    use_idf: bool,
+    apply_l2_norm: bool,
+    n_features: int,
+    chunk_size: int,
+) -> csr_matrix:
+    """Vectorize a stream of texts with the hashing trick, one chunk at a time.
+
+    Only ``chunk_size`` raw documents are held in memory at once. Document frequencies
+    are accumulated while hashing, and the IDF weights are then applied in place in a
+    second pass over the stacked matrix (smooth IDF, as ``TfidfVectorizer`` does).
+    """
+    hasher = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+
+    chunks = []
+    doc_freq = np.zeros(n_features, dtype=np.int64)
+    n_docs = 0
+
+    text_iter = iter(text)
+    while chunk := list(islice(text_iter, chunk_size)):
+        X_chunk = hasher.transform(chunk)
+        # Each (document, feature) pair appears once in the hashed matrix
+        doc_freq += np.bincount(X_chunk.indices, minlength=n_features)
+        n_docs += X_chunk.shape[0]
+        chunks.append(X_chunk)
+
+    X = sparse.vstack(chunks, format="csr") if chunks else csr_matrix((0, n_features))
+    del chunks
+
+    if use_idf:
+        idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+        X.data *= idf[X.indices]
+
+    # Apply L2 normalization if requested (always for TF-IDF); normalize rejects an
+    # empty corpus, which is returned as an empty (0, n_features) matrix
+    if (use_idf or apply_l2_norm) and X.shape[0] > 0:
+        X = normalize(X, norm="l2", copy=False)
+
+    return X
+
+
 def vectorize_text(
     text: Union[list[str], pd.Series, Iterable[str]],
     method: str = "bow",
     apply_l2_norm: bool = True,
+    n_features: int = 2**20,
+    chunk_size: int = 10000,
 ) -> tuple[csr_matrix, dict[str, int]]:
     """Vectorize text using different methods.
 
+    The ``"hashing"`` and ``"hashing_tfidf"`` methods map words to a fixed number of
+    columns with the hashing trick and consume ``text`` in chunks, so memory does not
+    depend on the vocabulary size. They have no vocabulary, so an empty dict is returned.
+
     Parameters
     ----------
     text : Union[list[str], pd.Series, Iterable[str]]
         The text to vectorize, can be a list of strings, a pandas Series, or any iterable of strings.
     method : str, optional
-        The vectorization method to use, by default "bow"
+        The vectorization method to use ("bow", "tfidf", "hashing" or "hashing_tfidf"),
+        by default "bow"
     apply_l2_norm : bool, optional
         Whether to apply L2 normalization to the vectors, by default True
+    n_features : int, optional
+        Number of columns of the hashed methods, by default 2**20
+    chunk_size : int, optional
+        Number of documents hashed at once by the hashed methods, by default 10000
 
     Returns
     -------
     tuple[csr_matrix, dict[str, int]]
         The vectorized sparse matrix representation of the text and the vocabulary mapping.
     """
-    if method == "bow":
-        # Create the CountVectorizer object
-        vectorizer = CountVectorizer()
-    elif method == "tfidf":
-        # Create the TfidfVectorizer object
-        vectorizer = TfidfVectorizer(norm="l2")
-    else:
+    if method in HASHING_METHODS:
+        X = _hashing_vectorize(
+            text,
+            use_idf=method == "hashing_tfidf",
+            apply_l2_norm=apply_l2_norm,
+            n_features=n_features,
+            chunk_size=chunk_size,
+        )
+        return X, {}
+
+    if method not in VECTORIZATION_METHODS:
         raise ValueError(
-            f"Unsupported vectorization method: {method}. Available methods are: 'bow', 'tfidf'."
+            f"Unsupported vectorization method: {method}. "
+            "Available methods are: 'bow', 'tfidf', 'hashing', 'hashing_tfidf'."
         )
 
+    vectorizer = TextVectorizer(method=method, apply_l2_norm=apply_l2_norm)
+
     # Fit and transform the texts to obtain the count matrix
     X = vectorizer.fit_transform(text)
 
-    # Apply L2 normalization if requested
-    if apply_l2_norm and method == "bow":
-        X = normalize(X, norm="l2")
-
     # Vocabulary
-    vocab = vectorizer.vocabulary_
+    vocab = vectorizer.vocabulary
 
     return X, vocab
 
@@ -130,3 +327,12 @@ if __name__ == "__main__":
     print("\nTF-IDF Vectors:")
     print(tfidf_vectors.toarray())
     print("TF-IDF shape:", tfidf_vectors.shape)
+
+    # Fit once, save, and project new documents into the same space
+    tfidf_vectorizer = TextVectorizer(method="tfidf")
+    tfidf_vectorizer.fit(texts)
+    tfidf_vectorizer.save("data/VSM/example_tfidf")
+    new_vectors = TextVectorizer.load("data/VSM/example_tfidf").transform(
+        ["A new sample document."]
+    )
+    print("\nNew document TF-IDF shape:", new_vectors.shape)
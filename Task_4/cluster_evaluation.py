@@ -1,25 +1,121 @@
-import bcubed
+from typing import Sequence, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.special import gammaln
 from sklearn.metrics import adjusted_rand_score
 
 
-def bcubed_evaluation(ldict: dict, cdict: dict):
+def _incidence_matrix(label_sets: list[frozenset]) -> sparse.csr_matrix:
+    """Binary (sets x labels) matrix of a list of label sets."""
+    lengths = np.fromiter(map(len, label_sets), dtype=np.int64, count=len(label_sets))
+    label_ids, _ = pd.factorize(
+        np.fromiter(
+            (label for labels in label_sets for label in labels),
+            dtype=object,
+            count=int(lengths.sum()),
+        )
+    )
+    indptr = np.concatenate(([0], np.cumsum(lengths)))
+    return sparse.csr_matrix(
+        (np.ones(len(label_ids)), label_ids, indptr),
+        shape=(len(label_sets), max(len(label_ids) and label_ids.max() + 1, 1)),
+    )
+
+
+def _bcubed_multi_label(ldict: dict, cdict: dict) -> tuple[float, float]:
+    """Extended BCubed precision and recall (Amigo et al., 2009) of overlapping assignments.
+
+    The precision of a document averages min(k, m) / k over the documents it shares
+    k >= 1 clusters and m classes with (recall: min(k, m) / m over m >= 1). Documents
+    are grouped by their distinct cluster set and class set, so for every (k, m) the
+    number of such documents is one sparse product between the indicator matrix of
+    "k shared clusters" across cluster sets, the (cluster sets x class sets) document
+    counts and the indicator matrix of "m shared classes" across class sets.
+    """
+    items = list(cdict)
+    cluster_set_ids, cluster_sets = pd.factorize(
+        pd.Series([frozenset(cdict[item]) for item in items], dtype=object)
+    )
+    class_set_ids, class_sets = pd.factorize(
+        pd.Series([frozenset(ldict[item]) for item in items], dtype=object)
+    )
+
+    # Number of shared clusters (classes) between every pair of cluster (class) sets
+    cluster_incidence = _incidence_matrix(list(cluster_sets))
+    class_incidence = _incidence_matrix(list(class_sets))
+    shared_clusters = (cluster_incidence @ cluster_incidence.T).tocsr()
+    shared_classes = (class_incidence @ class_incidence.T).tocsr()
+
+    # Number of documents of each (cluster set, class set) pair, i.e. of each signature
+    counts = sparse.coo_matrix(
+        (np.ones(len(items)), (cluster_set_ids, class_set_ids)),
+        shape=(len(cluster_sets), len(class_sets)),
+    ).tocsr()
+    counts.sum_duplicates()
+    signature_rows, signature_cols = counts.nonzero()
+    weights = np.asarray(counts[signature_rows, signature_cols]).ravel()
+
+    precision_num = np.zeros(len(weights))
+    recall_num = np.zeros(len(weights))
+    for k in np.unique(shared_clusters.data):
+        with_k_clusters = (shared_clusters == k).astype(np.float64) @ counts
+        for m in np.unique(shared_classes.data):
+            related = with_k_clusters @ (shared_classes == m).astype(np.float64).T
+            n_related = np.asarray(related[signature_rows, signature_cols]).ravel()
+            precision_num += min(k, m) / k * n_related
+            recall_num += min(k, m) / m * n_related
+
+    # Documents sharing at least one cluster (precision) or class (recall)
+    precision_den = ((shared_clusters > 0).astype(np.float64) @ counts.sum(axis=1)).A1
+    recall_den = ((shared_classes > 0).astype(np.float64) @ counts.sum(axis=0).T).A1
+
+    precision = (weights * precision_num / precision_den[signature_rows]).sum() / len(items)
+    recall = (weights * recall_num / recall_den[signature_cols]).sum() / len(items)
+    return float(precision), float(recall)
+
+
+def bcubed_evaluation(
+    ldict: Union[dict, Sequence], cdict: Union[dict, Sequence], beta: float = 1.0
+):
     """Evaluate clustering using BCubed metrics.
 
+    Single-label assignments are scored from the class x cluster contingency table, in
+    linear time. Documents with several classes or clusters are scored with the
+    extended BCubed metrics, as the ``bcubed`` package does.
+
     Parameters
     ----------
-    cdict : dict
-        Predicted cluster labels.
-    ldict : dict
-        Ground truth labels.
+    ldict : Union[dict, Sequence]
+        Ground truth labels, as {item: set of classes} or one label per item.
+    cdict : Union[dict, Sequence]
+        Predicted cluster labels, as {item: set of clusters} or one label per item.
+    beta : float, optional
+        Weight of the recall in the F-score, by default 1.0
 
     Returns
     -------
     tuple
         BCubed precision, recall, and F-score.
     """
-    precision = bcubed.precision(cdict, ldict)
-    recall = bcubed.recall(cdict, ldict)
-    fscore = bcubed.fscore(precision, recall)
+    if (
+        isinstance(cdict, dict)
+        and isinstance(ldict, dict)
+        and all(len(labels) == 1 for labels in cdict.values())
+        and all(len(ldict[item]) == 1 for item in cdict)
+    ):
+        ldict = [next(iter(ldict[item])) for item in cdict]
+        cdict = [next(iter(labels)) for labels in cdict.values()]
+
+    if isinstance(cdict, dict) and isinstance(ldict, dict):
+        precision, recall = _bcubed_multi_label(ldict, cdict)
+    else:
+        true_ids, _ = pd.factorize(np.asarray(ldict))
+        table, column_labelings = _contingency_table(true_ids, np.asarray(cdict)[None, :])
+        precision, recall = (float(score[0]) for score in _bcubed(table, column_labelings, 1))
+
+    fscore = (1 + beta**2) * (precision * recall) / (beta**2 * precision + recall)
 
     return precision, recall, fscore
 
@@ -40,3 +136,240 @@ def ari_evaluation(ldict: dict, cdict: dict):
         ARI score.
     """
     return adjusted_rand_score(ldict, cdict)
+
+
+def _contingency_table(
+    true_ids: np.ndarray, labels_pred_stack: np.ndarray
+) -> tuple[sparse.coo_matrix, np.ndarray]:
+    """Sparse contingency table of a stack of labelings, without empty cells.
+
+    The clusters of every labeling are the columns of a single (classes x clusters)
+    table, grouped by labeling; the second array gives the labeling of each column.
+    """
+    n_labelings, n_items = labels_pred_stack.shape
+    label_ids, labels = pd.factorize(labels_pred_stack.ravel())
+    # Number the (labeling, label) pairs, so that each labeling has its own clusters
+    labeling_ids = np.repeat(np.arange(n_labelings, dtype=np.int64), n_items)
+    pred_ids, keys = pd.factorize(labeling_ids * max(len(labels), 1) + label_ids)
+
+    table = sparse.coo_matrix(
+        (np.ones(len(pred_ids), dtype=np.int64), (np.tile(true_ids, n_labelings), pred_ids)),
+        shape=(int(true_ids.max()) + 1 if len(true_ids) else 0, len(keys)),
+    ).tocsr()
+    table.sum_duplicates()
+    return table.tocoo(), keys // max(len(labels), 1)
+
+
+def _bcubed(
+    table: sparse.coo_matrix, column_labelings: np.ndarray, n_labelings: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """BCubed precision and recall of each labeling of a stacked contingency table.
+
+    Each of the n_ij items of class i in cluster j has precision n_ij / |j| and recall
+    n_ij / |i|.
+    """
+    counts = table.data.astype(np.float64)
+    # Every labeling covers all the items, so each class is counted once per labeling
+    class_sizes = np.bincount(table.row, weights=counts, minlength=table.shape[0]) / n_labelings
+    cluster_sizes = np.bincount(table.col, weights=counts, minlength=table.shape[1])
+    cell_labelings = column_labelings[table.col]
+    n_items = class_sizes.sum()
+
+    squared = counts**2
+    precision = np.bincount(
+        cell_labelings, weights=squared / cluster_sizes[table.col], minlength=n_labelings
+    )
+    recall = np.bincount(
+        cell_labelings, weights=squared / class_sizes[table.row], minlength=n_labelings
+    )
+    return precision / n_items, recall / n_items
+
+
+def _expected_mutual_information(
+    class_sizes: np.ndarray,
+    cluster_sizes: np.ndarray,
+    column_labelings: np.ndarray,
+    n_labelings: int,
+    n_items: int,
+) -> np.ndarray:
+    """Expected mutual information of each labeling under the permutation model.
+
+    Computed from the marginals only, as sklearn's ``expected_mutual_information``: for
+    every class i and cluster j, the hypergeometric probability of each possible n_ij
+    weights its mutual information term. All the clusters of the stack are handled at
+    once for each class.
+    """
+    # Every gamma function argument is an integer in [1, N + 1]: tabulate log(k!) once
+    log_factorial = gammaln(np.arange(n_items + 1) + 1)
+    log_n = np.log(n_items)
+    class_sizes = class_sizes.astype(np.int64)
+    cluster_sizes = cluster_sizes.astype(np.int64)
+    gln_b = log_factorial[cluster_sizes] + log_factorial[n_items - cluster_sizes]
+    log_b = np.log(cluster_sizes)
+    emi = np.zeros(n_labelings)
+    for a in class_sizes:
+        # n_ij ranges from max(1, a + b - N) to min(a, b) for a cluster of size b
+        start = np.maximum(a + cluster_sizes - n_items, 1)
+        lengths = np.minimum(a, cluster_sizes) - start + 1
+        columns = np.repeat(np.arange(len(cluster_sizes)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        nij = start[columns] + offsets
+        b = cluster_sizes[columns]
+
+        term1 = nij / n_items
+        term2 = log_n + np.log(nij) - np.log(a) - log_b[columns]
+        gln = (
+            log_factorial[a]
+            + log_factorial[n_items - a]
+            + gln_b[columns]
+            - (log_factorial[nij] + log_factorial[n_items])
+            - log_factorial[a - nij]
+            - log_factorial[b - nij]
+            - log_factorial[n_items - a - b + nij]
+        )
+        emi += np.bincount(
+            column_labelings[columns], weights=term1 * term2 * np.exp(gln), minlength=n_labelings
+        )
+    return emi
+
+
+def _entropy(counts: np.ndarray, n_items: int) -> float:
+    """Entropy (in nats) of label counts."""
+    counts = counts[counts > 0]
+    return float(-(counts / n_items * (np.log(counts) - np.log(n_items))).sum())
+
+
+def _labeling_scores(true_ids: np.ndarray, labels_pred_stack: np.ndarray) -> dict[str, np.ndarray]:
+    """All the metrics of each labeling of the stack, from one shared contingency table."""
+    n_labelings, n_items = labels_pred_stack.shape
+    table, column_labelings = _contingency_table(true_ids, labels_pred_stack)
+    counts = table.data.astype(np.float64)
+    cell_labelings = column_labelings[table.col]
+    class_sizes = np.bincount(true_ids, minlength=table.shape[0]).astype(np.float64)
+    cluster_sizes = np.bincount(table.col, weights=counts, minlength=table.shape[1])
+    n_classes = len(class_sizes)
+    n_clusters = np.bincount(column_labelings, minlength=n_labelings)
+    # With a single class or cluster, the mutual information (and its expectation) is 0
+    constant = (n_classes == 1) | (n_clusters == 1)
+
+    def per_labeling(weights: np.ndarray, labelings: np.ndarray = cell_labelings) -> np.ndarray:
+        return np.bincount(labelings, weights=weights, minlength=n_labelings)
+
+    precision, recall = _bcubed(table, column_labelings, n_labelings)
+    fscore = 2 * precision * recall / (precision + recall)
+
+    # ARI from the pair confusion matrix, as adjusted_rand_score
+    sum_squares = per_labeling(counts**2)
+    true_positives = sum_squares - n_items
+    false_positives = per_labeling(cluster_sizes**2, column_labelings) - sum_squares
+    false_negatives = (class_sizes**2).sum() - sum_squares
+    true_negatives = float(n_items) ** 2 - false_positives - false_negatives - sum_squares
+    perfect = (false_negatives == 0) & (false_positives == 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ari = np.where(
+            perfect,
+            1.0,
+            2.0
+            * (true_positives * true_negatives - false_negatives * false_positives)
+            / (
+                (true_positives + false_negatives) * (false_negatives + true_negatives)
+                + (true_positives + false_positives) * (false_positives + true_negatives)
+            ),
+        )
+
+    # Mutual information and entropies (in nats)
+    mi_terms = (
+        counts
+        / n_items
+        * (
+            np.log(counts)
+            + np.log(n_items)
+            - np.log(class_sizes)[table.row]
+            - np.log(cluster_sizes)[table.col]
+        )
+    )
+    mi_terms[np.abs(mi_terms) < np.finfo(np.float64).eps] = 0.0
+    mi = np.maximum(per_labeling(mi_terms), 0.0)
+    mi[constant] = 0.0
+    h_true = _entropy(class_sizes, n_items)
+    h_pred = per_labeling(
+        -cluster_sizes / n_items * (np.log(cluster_sizes) - np.log(n_items)), column_labelings
+    )
+
+    # A single class and a single cluster is a perfect match
+    single = (n_classes == 1) & (n_clusters == 1)
+    mean_entropy = (h_true + h_pred) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        nmi = np.where(single, 1.0, np.where(mi == 0, 0.0, mi / mean_entropy))
+        homogeneity = np.full(n_labelings, 1.0) if h_true == 0 else mi / h_true
+        completeness = np.where(h_pred > 0, mi / h_pred, 1.0)
+        v_measure = np.where(
+            homogeneity + completeness == 0,
+            0.0,
+            2 * homogeneity * completeness / (homogeneity + completeness),
+        )
+
+    # AMI, with the expected mutual information and the denominator of
+    # adjusted_mutual_info_score (kept away from zero)
+    emi = _expected_mutual_information(
+        class_sizes, cluster_sizes, column_labelings, n_labelings, n_items
+    )
+    emi[constant] = 0.0
+    eps = np.finfo(np.float64).eps
+    denominator = mean_entropy - emi
+    denominator = np.where(
+        denominator < 0, np.minimum(denominator, -eps), np.maximum(denominator, eps)
+    )
+    ami = np.where(single, 1.0, (mi - emi) / denominator)
+
+    # Purity: the largest class of each cluster
+    largest = np.asarray(table.tocsc().max(axis=0).todense(), dtype=np.float64).ravel()
+    purity = per_labeling(largest, column_labelings) / n_items
+
+    return {
+        "bcubed_precision": precision,
+        "bcubed_recall": recall,
+        "bcubed_fscore": fscore,
+        "ari": ari,
+        "nmi": nmi,
+        "ami": ami,
+        "homogeneity": homogeneity,
+        "completeness": completeness,
+        "v_measure": v_measure,
+        "purity": purity,
+    }
+
+
+def evaluate_clusterings(
+    labels_true: Sequence, labels_pred_stack: Union[Sequence, np.ndarray]
+) -> pd.DataFrame:
+    """Score one or many clusterings against the ground truth from their contingency tables.
+
+    A single sparse contingency table is built for the whole stack, with the clusters
+    of every labeling as its columns, and all metrics are derived from it in one pass:
+    BCubed precision/recall/F-score, ARI, NMI and AMI (arithmetic normalization),
+    homogeneity, completeness, V-measure and purity. The values are the same as those
+    of the scikit-learn functions.
+
+    Parameters
+    ----------
+    labels_true : Sequence
+        Ground truth category of each item.
+    labels_pred_stack : Union[Sequence, np.ndarray]
+        One labeling (one cluster label per item) or a stack of labelings, as a
+        (labelings x items) array or a list of labelings.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row of metrics per labeling.
+    """
+    labels_pred_stack = np.asarray(labels_pred_stack)
+    if labels_pred_stack.ndim == 1:
+        labels_pred_stack = labels_pred_stack[None, :]
+    n_items = labels_pred_stack.shape[1]
+    if len(labels_true) != n_items:
+        raise ValueError(f"labels_true has {len(labels_true)} items, the labelings have {n_items}")
+
+    true_ids, _ = pd.factorize(np.asarray(labels_true))
+    return pd.DataFrame(_labeling_scores(true_ids, labels_pred_stack))
@@ -1,12 +1,301 @@
-from typing import Optional
+import os
+from typing import Iterable, Optional, Union
 
-from sklearn.cluster import KMeans
-from sklearn.pipeline import make_pipeline
-from sklearn.preprocessing import Normalizer
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.base import BaseEstimator, ClusterMixin
+from sklearn.cluster import KMeans, kmeans_plusplus
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import Normalizer, normalize
+from sklearn.utils.extmath import safe_sparse_dot
 from umap import UMAP
 
 
-def kmeans_pipeline(vectors, n_components: Optional[int], n_clusters: int = 7):
+class SphericalMiniBatchKMeans(BaseEstimator, ClusterMixin):
+    """Mini-batch k-means on the unit sphere (cosine similarity), for sparse input.
+
+    Rows are L2-normalized and assigned to the centroid with the highest dot product;
+    centroids are updated with per-cluster learning rates (Sculley, 2010) and projected
+    back onto the unit sphere after every batch. CSR matrices are never densified: only
+    the (batch x n_clusters) similarities and the centroids are dense.
+
+    Parameters
+    ----------
+    n_clusters : int, optional
+        Number of clusters, by default 7
+    init : Union[str, np.ndarray], optional
+        "k-means++", or an (n_clusters x n_features) array of initial centroids, e.g.
+        the ``cluster_centers_`` of a previous run, by default "k-means++". Initial
+        centroids are first moved to the mean of the rows assigned to them, in one
+        pass over the data; if they move by less than ``tol``, ``fit`` stops there.
+    batch_size : int, optional
+        Number of rows per mini-batch, by default 4096
+    max_iter : int, optional
+        Maximum number of passes over the data in ``fit``, by default 100
+    tol : float, optional
+        ``fit`` stops when a batch moves the centroids by less than ``tol`` (mean
+        squared shift of a unit centroid), by default 5e-3; 0.0 to only use
+        ``max_no_improvement``
+    max_no_improvement : int, optional
+        ``fit`` stops after this many batches without improvement of the smoothed
+        batch inertia, by default 10
+    reassignment_ratio : float, optional
+        Centroids that received fewer than this fraction of the rows of the largest
+        cluster are moved to random rows of the batch, by default 0.01
+    n_init : int, optional
+        Number of k-means++ seedings tried on the initialization sample; the one with
+        the lowest inertia on that sample is kept, by default 3
+    random_state : Optional[int], optional
+        Seed of the initialization and batch sampling, by default 42
+
+    Attributes
+    ----------
+    cluster_centers_ : np.ndarray
+        Unit-norm centroids.
+    labels_ : np.ndarray
+        Cluster of each row of the data passed to ``fit`` (or of the last
+        ``partial_fit`` batch).
+    inertia_ : float
+        Sum of the cosine distances (1 - similarity) of those rows to their centroid.
+    n_steps_ : int
+        Number of mini-batches processed (plus the pass of a warm start).
+    """
+
+    def __init__(
+        self,
+        n_clusters: int = 7,
+        init: Union[str, np.ndarray] = "k-means++",
+        batch_size: int = 4096,
+        max_iter: int = 100,
+        tol: float = 5e-3,
+        max_no_improvement: int = 10,
+        reassignment_ratio: float = 0.01,
+        n_init: int = 3,
+        random_state: Optional[int] = 42,
+    ):
+        self.n_clusters = n_clusters
+        self.init = init
+        self.batch_size = batch_size
+        self.max_iter = max_iter
+        self.tol = tol
+        self.max_no_improvement = max_no_improvement
+        self.reassignment_ratio = reassignment_ratio
+        self.n_init = n_init
+        self.random_state = random_state
+
+    def _init_centroids(self, X, rng: np.random.RandomState) -> float:
+        """Set the initial centroids, and return their mean squared shift (inf for k-means++)."""
+        if isinstance(self.init, str):
+            if self.init != "k-means++":
+                raise ValueError(f"Invalid init: {self.init}. Choose 'k-means++' or an array.")
+            # Seed on a sample, as MiniBatchKMeans does
+            sample_size = min(X.shape[0], max(3 * self.batch_size, 3 * self.n_clusters))
+            sample = X[rng.choice(X.shape[0], sample_size, replace=False)]
+            best_similarity = -np.inf
+            for _ in range(self.n_init):
+                candidates, _ = kmeans_plusplus(sample, self.n_clusters, random_state=rng)
+                similarity = (
+                    np.asarray(safe_sparse_dot(sample, normalize(candidates).T, dense_output=True))
+                    .max(axis=1)
+                    .sum()
+                )
+                if similarity > best_similarity:
+                    best_similarity, centers = similarity, candidates
+        else:
+            centers = np.array(self.init, dtype=np.float64)
+            if centers.shape != (self.n_clusters, X.shape[1]):
+                raise ValueError(
+                    f"init has shape {centers.shape}, expected {(self.n_clusters, X.shape[1])}"
+                )
+        # Running means of the rows of each cluster; the centroids are their directions
+        self._means = normalize(np.asarray(centers, dtype=np.float64))
+        self.cluster_centers_ = self._means.copy()
+        self._counts = np.zeros(self.n_clusters, dtype=np.float64)
+        self._rng = rng
+        self._n_since_last_reassign = 0
+        self.n_steps_ = 0
+        if isinstance(self.init, str):
+            return np.inf
+
+        # Warm start: weigh the supplied centroids by the rows they are assigned, with
+        # one full (Lloyd) update over X, so that the batches refine them instead of
+        # overwriting them with the first batch
+        sums = np.zeros_like(self._means)
+        for start in range(0, X.shape[0], self.batch_size):
+            batch = X[start : start + self.batch_size]
+            batch_sums, batch_counts = self._cluster_sums(batch, self._similarities(batch))
+            sums += batch_sums
+            self._counts += batch_counts
+        updated = self._counts > 0
+        self._means[updated] = sums[updated] / self._counts[updated, None]
+        self.cluster_centers_ = normalize(self._means)
+        self.n_steps_ = 1
+        return float(((self.cluster_centers_ - normalize(centers)) ** 2).sum(axis=1).mean())
+
+    def _similarities(self, X) -> np.ndarray:
+        return np.asarray(safe_sparse_dot(X, self.cluster_centers_.T, dense_output=True))
+
+    def _cluster_sums(self, X_batch, similarities: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Per-cluster sums and counts of the rows of a batch, given their similarities."""
+        labels = similarities.argmax(axis=1)
+        # Per-cluster sums of the batch rows, as a sparse (clusters x batch) product
+        assignment = sparse.csr_matrix(
+            (np.ones(len(labels)), (labels, np.arange(len(labels)))),
+            shape=(self.n_clusters, len(labels)),
+        )
+        sums = assignment @ X_batch
+        sums = sums.toarray() if sparse.issparse(sums) else np.asarray(sums)
+        return sums, np.bincount(labels, minlength=self.n_clusters)
+
+    def _step(self, X_batch) -> tuple[np.ndarray, float, float]:
+        """Update the centroids with one (normalized) batch.
+
+        Returns the labels of the batch, its inertia and the mean squared centroid shift.
+        """
+        similarities = self._similarities(X_batch)
+        labels = similarities.argmax(axis=1)
+        inertia = float(X_batch.shape[0] - similarities[np.arange(len(labels)), labels].sum())
+        sums, batch_counts = self._cluster_sums(X_batch, similarities)
+
+        updated = batch_counts > 0
+        self._counts[updated] += batch_counts[updated]
+        # m <- (1 - eta) m + eta * mean, with eta = batch_count / total_count
+        rate = 1 / self._counts[updated, None]
+        self._means[updated] += rate * (
+            sums[updated] - batch_counts[updated, None] * self._means[updated]
+        )
+        self.n_steps_ += 1
+
+        # Move (nearly) empty clusters to random rows, as MiniBatchKMeans does, each time
+        # 10 * n_clusters rows have been seen
+        self._n_since_last_reassign += len(labels)
+        if (self._counts == 0).any() or self._n_since_last_reassign >= 10 * self.n_clusters:
+            self._n_since_last_reassign = 0
+            to_reassign = self._counts < self.reassignment_ratio * self._counts.max()
+            n_reassign = min(int(to_reassign.sum()), len(labels))
+            if n_reassign:
+                rows = self._rng.choice(len(labels), n_reassign, replace=False)
+                new_centers = X_batch[rows]
+                new_centers = new_centers.toarray() if sparse.issparse(new_centers) else new_centers
+                self._means[np.flatnonzero(to_reassign)[:n_reassign]] = new_centers
+                self._counts[to_reassign] = self._counts[~to_reassign].min()
+
+        old_centers = self.cluster_centers_
+        self.cluster_centers_ = normalize(self._means)
+        shift = float(((self.cluster_centers_ - old_centers) ** 2).sum(axis=1).mean())
+        return labels, inertia, shift
+
+    def fit(self, X, y=None) -> "SphericalMiniBatchKMeans":
+        """Cluster ``X`` (dense or sparse), sampling mini-batches until convergence."""
+        X = normalize(X)
+        rng = np.random.RandomState(self.random_state)
+        if self._init_centroids(X, rng) <= self.tol:
+            # Warm start from centroids that the data does not move
+            self.labels_, self.inertia_ = self._assign(X)
+            return self
+
+        n_samples = X.shape[0]
+        batch_size = min(self.batch_size, n_samples)
+        max_steps = self.max_iter * int(np.ceil(n_samples / batch_size))
+
+        smoothed_inertia = None
+        best_inertia = np.inf
+        no_improvement = 0
+        for _ in range(max_steps):
+            batch = X[rng.choice(n_samples, batch_size, replace=False)]
+            _, inertia, shift = self._step(batch)
+            if shift <= self.tol:
+                break
+
+            # Exponentially weighted average of the batch inertia, as in MiniBatchKMeans
+            inertia /= batch_size
+            alpha = min(batch_size * 2.0 / (n_samples + 1), 1.0)
+            if smoothed_inertia is None:
+                smoothed_inertia = inertia
+            else:
+                smoothed_inertia = smoothed_inertia * (1 - alpha) + inertia * alpha
+            if smoothed_inertia < best_inertia:
+                best_inertia = smoothed_inertia
+                no_improvement = 0
+            else:
+                no_improvement += 1
+                if no_improvement >= self.max_no_improvement:
+                    break
+
+        self.labels_, self.inertia_ = self._assign(X)
+        return self
+
+    def partial_fit(self, X, y=None) -> "SphericalMiniBatchKMeans":
+        """Update the centroids with one chunk of data (e.g. from a stream)."""
+        X = normalize(X)
+        if not hasattr(self, "cluster_centers_") and np.isfinite(
+            self._init_centroids(X, np.random.RandomState(self.random_state))
+        ):
+            # A warm start has already been updated with this chunk
+            self.labels_, self.inertia_ = self._assign(X)
+            return self
+        self.labels_, self.inertia_, _ = self._step(X)
+        return self
+
+    def _assign(self, X) -> tuple[np.ndarray, float]:
+        """Labels and inertia of normalized rows, computed in batches to bound memory."""
+        labels = np.empty(X.shape[0], dtype=np.int64)
+        inertia = 0.0
+        for start in range(0, X.shape[0], self.batch_size):
+            similarities = self._similarities(X[start : start + self.batch_size])
+            batch_labels = similarities.argmax(axis=1)
+            labels[start : start + len(batch_labels)] = batch_labels
+            inertia += len(batch_labels) - similarities.max(axis=1).sum()
+        return labels, float(inertia)
+
+    def predict(self, X) -> np.ndarray:
+        """Index of the most similar centroid of each row of ``X``."""
+        return self._assign(normalize(X))[0]
+
+
+def kmeans_pipeline(
+    vectors,
+    n_components: Optional[int],
+    n_clusters: int = 7,
+    minibatch: bool = False,
+    init_centroids: Optional[np.ndarray] = None,
+    batch_size: int = 4096,
+    return_pipeline: bool = False,
+    save_path: Optional[str] = None,
+):
+    """Cluster the vectors with KMeans, optionally after a UMAP reduction.
+
+    Parameters
+    ----------
+    vectors : array-like or sparse matrix
+        Vectors to cluster (e.g. TF-IDF or sentence embeddings).
+    n_components : Optional[int]
+        Number of UMAP components, or None to cluster the vectors directly.
+    n_clusters : int, optional
+        Number of clusters, by default 7
+    minibatch : bool, optional
+        Use ``SphericalMiniBatchKMeans`` instead of full-batch ``KMeans``; it works on
+        sparse input without densifying it, by default False
+    init_centroids : Optional[np.ndarray], optional
+        Centroids of a previous run (in the space the clusters are computed in), to
+        warm-start the clustering instead of initializing it from scratch,
+        by default None
+    batch_size : int, optional
+        Mini-batch size of the mini-batch mode, by default 4096
+    return_pipeline : bool, optional
+        Whether to also return the fitted pipeline, by default False
+    save_path : Optional[str], optional
+        If given, the fitted pipeline is saved there with ``save_pipeline``,
+        by default None
+
+    Returns
+    -------
+    Union[np.ndarray, tuple[np.ndarray, Pipeline]]
+        The cluster label of each vector, and the fitted pipeline if
+        ``return_pipeline`` is True. New vectors are assigned to the clusters of a
+        fitted pipeline with ``assign_clusters``.
+    """
     # vectors are normalized with L2
     # This implies that minimizing the Euclidean distance
     # between normalized vectors is equivalent to maximizing
@@ -16,7 +305,17 @@ def kmeans_pipeline(vectors, n_components: Optional[int], n_clusters: int = 7):
     # Create a normalizer that will apply L2 normalization after UMAP
     normalizer = Normalizer(norm="l2")
 
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+    if minibatch:
+        kmeans = SphericalMiniBatchKMeans(
+            n_clusters=n_clusters,
+            init="k-means++" if init_centroids is None else init_centroids,
+            batch_size=batch_size,
+            random_state=42,
+        )
+    elif init_centroids is not None:
+        kmeans = KMeans(n_clusters=n_clusters, init=init_centroids, n_init=1, random_state=42)
+    else:
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
 
     # Create pipeline: UMAP (if n_components is not None) -> L2 normalization -> KMeans
     if n_components:
@@ -26,6 +325,89 @@ def kmeans_pipeline(vectors, n_components: Optional[int], n_clusters: int = 7):
         pipeline = make_pipeline(normalizer, kmeans)
     pipeline.fit(vectors)
 
-    cluster_labels = pipeline.named_steps["kmeans"].labels_
+    cluster_labels = pipeline[-1].labels_
 
+    if save_path is not None:
+        save_pipeline(pipeline, save_path)
+
+    if return_pipeline:
+        return cluster_labels, pipeline
     return cluster_labels
+
+
+def save_pipeline(pipeline: Pipeline, filepath: str) -> None:
+    """Save a fitted clustering pipeline (UMAP, normalizer and KMeans) with joblib.
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        Pipeline fitted by ``kmeans_pipeline``.
+    filepath : str
+        Path of the file to write.
+    """
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    joblib.dump(pipeline, filepath)
+    print(f"Pipeline saved at: {filepath}")
+
+
+def load_pipeline(filepath: str) -> Pipeline:
+    """Load a clustering pipeline saved by ``save_pipeline``."""
+    return joblib.load(filepath)
+
+
+def assign_clusters(pipeline: Pipeline, new_vectors) -> np.ndarray:
+    """Assign new vectors to the clusters of a fitted pipeline, without refitting it.
+
+    The vectors go through the fitted UMAP (``transform``) and normalizer, and each one
+    is assigned to its nearest centroid, for a whole batch at once: the nearest centroid
+    ``c`` of ``z`` maximizes ``z . c - ||c||^2 / 2``.
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        Pipeline fitted by ``kmeans_pipeline`` (or loaded with ``load_pipeline``).
+    new_vectors : array-like or sparse matrix
+        Vectors in the same space as the ones the pipeline was fitted on (e.g.
+        transformed with the same fitted ``TextVectorizer``), one row per document.
+
+    Returns
+    -------
+    np.ndarray
+        The cluster label of each vector.
+    """
+    reduced = pipeline[:-1].transform(new_vectors)
+    centers = pipeline[-1].cluster_centers_
+    scores = np.asarray(safe_sparse_dot(reduced, centers.T, dense_output=True))
+    scores -= 0.5 * (centers**2).sum(axis=1)
+    return scores.argmax(axis=1)
+
+
+def kmeans_stream(
+    chunks: Iterable,
+    n_clusters: int = 7,
+    init_centroids: Optional[np.ndarray] = None,
+) -> SphericalMiniBatchKMeans:
+    """Fit a ``SphericalMiniBatchKMeans`` on a stream of chunks with ``partial_fit``.
+
+    Parameters
+    ----------
+    chunks : Iterable
+        Chunks of vectors (dense or sparse), e.g. TF-IDF matrices of corpus chunks
+        transformed with the same fitted vectorizer.
+    n_clusters : int, optional
+        Number of clusters, by default 7
+    init_centroids : Optional[np.ndarray], optional
+        Centroids of a previous run, by default None (k-means++ on the first chunk)
+
+    Returns
+    -------
+    SphericalMiniBatchKMeans
+        The fitted model; use ``predict`` to label the documents.
+    """
+    kmeans = SphericalMiniBatchKMeans(
+        n_clusters=n_clusters,
+        init="k-means++" if init_centroids is None else init_centroids,
+    )
+    for chunk in chunks:
+        kmeans.partial_fit(chunk)
+    return kmeans
@@ -0,0 +1,478 @@
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from cluster_evaluation import ari_evaluation, bcubed_evaluation
+from clustering import kmeans_pipeline
+
+
+VSM_METHODS = ("bow", "tfidf")
+EMBEDDING_METHODS = ("average", "additive", "tfidf", "sif")
+
+
+class Stage(NamedTuple):
+    """A step of the pipeline: ``func(*input_artifacts, **params)`` returns its artifact.
+
+    ``kind`` is the storage format of the artifact (a key of ``ARTIFACT_FORMATS``).
+    ``source``, if given, is called with the params and fingerprints external data the
+    stage reads (e.g. the corpus files), so the stage is re-run when that data changes.
+    ``options`` are keyword arguments of ``func`` that do not change its result (e.g.
+    numbers of workers), so they are left out of the fingerprint. ``version`` is part of
+    the fingerprint: bump it when ``func`` changes behavior.
+
+    The corpus, preprocessing and vectorization functions live in the Task_3 directory
+    and are imported when the stages run, so it must be importable (as in the notebooks).
+    """
+
+    name: str
+    func: Callable[..., Any]
+    kind: str
+    inputs: tuple[str, ...] = ()
+    params: Optional[dict] = None
+    source: Optional[Callable[..., str]] = None
+    options: Optional[dict] = None
+    version: str = "1"
+
+
+def _save_frame(df: pd.DataFrame, path: str) -> None:
+    df.to_csv(f"{path}.csv", index=False)
+
+
+def _load_frame(path: str) -> pd.DataFrame:
+    return pd.read_csv(f"{path}.csv", dtype=str, keep_default_na=False)
+
+
+def _save_texts(texts: list[str], path: str) -> None:
+    pd.DataFrame({"text": texts}).to_csv(f"{path}.csv", index=False)
+
+
+def _load_texts(path: str) -> list[str]:
+    return pd.read_csv(f"{path}.csv", dtype=str, keep_default_na=False)["text"].tolist()
+
+
+def _save_sparse(vectors_vocab: tuple, path: str) -> None:
+    from vectorizing import save_vectors_scipy
+
+    save_vectors_scipy(*vectors_vocab, path)
+
+
+def _load_sparse(path: str):
+    from vectorizing import load_vectors_scipy
+
+    # The stages downstream only need the vectors, not the vocabulary
+    return load_vectors_scipy(path)[0]
+
+
+def _save_dense(embeddings: np.ndarray, path: str) -> None:
+    from embedding import save_embeddings
+
+    save_embeddings(embeddings, path, compressed=False)
+
+
+def _load_dense(path: str) -> np.ndarray:
+    from embedding import load_embeddings
+
+    return load_embeddings(f"{path}.npy", mmap_mode="r")
+
+
+def _save_labels(labels: np.ndarray, path: str) -> None:
+    np.save(f"{path}.npy", labels)
+
+
+def _load_labels(path: str) -> np.ndarray:
+    return np.load(f"{path}.npy")
+
+
+def _save_metrics(metrics: dict, path: str) -> None:
+    with open(f"{path}.json", "w") as f:
+        json.dump(metrics, f, indent=2)
+
+
+def _load_metrics(path: str) -> dict:
+    with open(f"{path}.json") as f:
+        return json.load(f)
+
+
+# Storage of each kind of artifact: save(artifact, path) and load(path), where path is
+# the artifact path without extension
+ARTIFACT_FORMATS: dict[str, tuple[Callable[[Any, str], None], Callable[[str], Any]]] = {
+    "frame": (_save_frame, _load_frame),
+    "texts": (_save_texts, _load_texts),
+    "sparse": (_save_sparse, _load_sparse),
+    "dense": (_save_dense, _load_dense),
+    "labels": (_save_labels, _load_labels),
+    "metrics": (_save_metrics, _load_metrics),
+}
+
+
+def corpus_fingerprint(corpus_path: str, **_) -> str:
+    """Fingerprint of the corpus files (path, size and modification time), without reading them."""
+    from utils import scan_corpus
+
+    digest = hashlib.blake2b(digest_size=16)
+    for category, document_id, file_path in sorted(scan_corpus(corpus_path)):
+        stat = os.stat(file_path)
+        digest.update(f"{category}/{document_id}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _load_corpus(corpus_path: str, max_workers: Optional[int] = None) -> pd.DataFrame:
+    from utils import build_corpus_dataframe
+
+    return build_corpus_dataframe(corpus_path, max_workers)
+
+
+def _clean(corpus_df: pd.DataFrame, n_jobs: int = 1) -> pd.DataFrame:
+    from text_preprocessing import clean_corpus
+
+    # clean_content is the single-pass remove_writes_lines(clean_header(content))
+    return pd.DataFrame(
+        {
+            "category": corpus_df["category"],
+            "document_id": corpus_df["document_id"],
+            "cleaned_content": clean_corpus(corpus_df["content"].tolist(), n_jobs=n_jobs),
+        }
+    )
+
+
+def _preprocess(
+    clean_df: pd.DataFrame, lemmatize: bool, model: str, n_process: int = 1
+) -> list[str]:
+    from text_preprocessing import preprocessing_pipeline
+
+    return preprocessing_pipeline(
+        clean_df["cleaned_content"].tolist(), model=model, lemmatize=lemmatize, n_process=n_process
+    )
+
+
+def _vectorize(texts: list[str], method: str):
+    from vectorizing import vectorize_text
+
+    return vectorize_text(texts, method=method)
+
+
+def _embed(texts: list[str], model: str, method: str) -> np.ndarray:
+    from embedding import create_sentence_embeddings, load_model
+
+    return create_sentence_embeddings(texts, load_model(model), method=method)
+
+
+def _cluster(vectors, n_components: Optional[int], n_clusters: int) -> np.ndarray:
+    return kmeans_pipeline(vectors, n_components=n_components, n_clusters=n_clusters)
+
+
+def _evaluate(clean_df: pd.DataFrame, labels_pred: np.ndarray) -> dict:
+    labels_true = clean_df["category"].astype(str).tolist()
+    precision, recall, fscore = bcubed_evaluation(labels_true, labels_pred.tolist())
+    return {
+        "bcubed_precision": float(precision),
+        "bcubed_recall": float(recall),
+        "bcubed_fscore": float(fscore),
+        "ari": float(ari_evaluation(labels_true, labels_pred)),
+    }
+
+
+def build_stages(
+    corpus_path: str,
+    vsm_methods: Iterable[str] = VSM_METHODS,
+    embedding_methods: Iterable[str] = ("average", "additive"),
+    n_components: Optional[int] = 50,
+    n_clusters: int = 7,
+    spacy_model: str = "en_core_web_sm",
+    embedding_model: str = "fasttext-wiki-news-subwords-300",
+    n_jobs: int = 1,
+) -> list[Stage]:
+    """Stages of the Task_3 -> Task_4 flow, as the notebooks run it.
+
+    corpus -> clean -> preprocess_vsm (lemmatized) -> {bow, tfidf}, and
+    clean -> preprocess_embedding (not lemmatized) -> embeddings_{method}; each
+    representation is then clustered (kmeans_{representation}) and evaluated against
+    the categories (evaluate_{representation}).
+
+    Parameters
+    ----------
+    corpus_path : str
+        Path to the corpus directory
+    vsm_methods : Iterable[str], optional
+        Vectorization methods of ``vectorize_text``, by default ("bow", "tfidf")
+    embedding_methods : Iterable[str], optional
+        Methods of ``create_sentence_embeddings``, by default ("average", "additive")
+    n_components : Optional[int], optional
+        UMAP components of ``kmeans_pipeline``, by default 50
+    n_clusters : int, optional
+        Number of clusters, by default 7
+    spacy_model : str, optional
+        The spaCy model of the preprocessing, by default "en_core_web_sm"
+    embedding_model : str, optional
+        The word embeddings model, by default "fasttext-wiki-news-subwords-300"
+    n_jobs : int, optional
+        Worker processes used inside the cleaning and preprocessing stages, by default 1
+
+    Returns
+    -------
+    list[Stage]
+        The stages, in topological order.
+    """
+    stages = [
+        Stage(
+            "corpus", _load_corpus, "frame", (), {"corpus_path": corpus_path}, corpus_fingerprint
+        ),
+        Stage("clean", _clean, "frame", ("corpus",), options={"n_jobs": n_jobs}),
+    ]
+
+    representations = []
+    vsm_methods = list(vsm_methods)
+    if vsm_methods:
+        stages.append(
+            Stage(
+                "preprocess_vsm",
+                _preprocess,
+                "texts",
+                ("clean",),
+                {"lemmatize": True, "model": spacy_model},
+                options={"n_process": n_jobs},
+            )
+        )
+        for method in vsm_methods:
+            stages.append(
+                Stage(method, _vectorize, "sparse", ("preprocess_vsm",), {"method": method})
+            )
+            representations.append(method)
+
+    embedding_methods = list(embedding_methods)
+    if embedding_methods:
+        stages.append(
+            Stage(
+                "preprocess_embedding",
+                _preprocess,
+                "texts",
+                ("clean",),
+                {"lemmatize": False, "model": spacy_model},
+                options={"n_process": n_jobs},
+            )
+        )
+        for method in embedding_methods:
+            name = f"embeddings_{method}"
+            params = {"model": embedding_model, "method": method}
+            stages.append(Stage(name, _embed, "dense", ("preprocess_embedding",), params))
+            representations.append(name)
+
+    for representation in representations:
+        stages.append(
+            Stage(
+                f"kmeans_{representation}",
+                _cluster,
+                "labels",
+                (representation,),
+                {"n_components": n_components, "n_clusters": n_clusters},
+            )
+        )
+        stages.append(
+            Stage(
+                f"evaluate_{representation}",
+                _evaluate,
+                "metrics",
+                ("clean", f"kmeans_{representation}"),
+            )
+        )
+    return stages
+
+
+def _stage_key(stage: Stage, input_hashes: list[str]) -> str:
+    """Fingerprint of a stage: its function, params and source data, and the content
+    hashes of its input artifacts."""
+    params = stage.params or {}
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        json.dumps(
+            {
+                "name": stage.name,
+                # Not the module: it is __main__ when this file is run as a script
+                "func": stage.func.__qualname__,
+                "version": stage.version,
+                "params": params,
+                "source": stage.source(**params) if stage.source is not None else None,
+                "inputs": input_hashes,
+            },
+            sort_keys=True,
+            default=repr,
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+def _artifact_hash(path: str) -> str:
+    """Hash of the content of the files of an artifact (path without extension)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for file_path in sorted(glob.glob(f"{glob.escape(path)}*")):
+        if file_path.endswith(".done"):
+            continue
+        digest.update(f"{file_path[len(path) :]}\n".encode())
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _run_stage(stage: Stage, inputs: list[tuple[str, str]], path: str) -> tuple[float, str]:
+    """Load the inputs of a stage from disk, run it and store its artifact.
+
+    Returns the duration of the stage and the content hash of its artifact.
+    """
+    start = time.perf_counter()
+    input_artifacts = [ARTIFACT_FORMATS[kind][1](input_path) for kind, input_path in inputs]
+    artifact = stage.func(*input_artifacts, **(stage.params or {}), **(stage.options or {}))
+    ARTIFACT_FORMATS[stage.kind][0](artifact, path)
+    seconds = time.perf_counter() - start
+    content_hash = _artifact_hash(path)
+
+    # The marker is written last: an interrupted stage is not taken as up to date
+    with open(f"{path}.done", "w") as f:
+        json.dump(
+            {"stage": stage.name, "params": stage.params, "seconds": seconds, "hash": content_hash},
+            f,
+            default=repr,
+        )
+    return seconds, content_hash
+
+
+def run_pipeline(
+    stages: list[Stage],
+    artifact_dir: str = "data/pipeline",
+    targets: Optional[Iterable[str]] = None,
+    n_jobs: int = 1,
+) -> dict[str, str]:
+    """Run the stale stages of a pipeline, reusing the artifacts of the others.
+
+    Every artifact is stored as ``{artifact_dir}/{stage}-{fingerprint}``, where the
+    fingerprint covers the stage's function, params and source data, and the content
+    hashes of its input artifacts. A stage only runs if the artifact of its current
+    fingerprint does not exist yet, so changing a parameter only re-runs the stages
+    downstream of it, and reverting it reuses the previous artifacts. A stage that runs
+    again but produces the same artifact (e.g. the corpus after a file was touched) does
+    not invalidate the stages downstream of it. Stages whose inputs are ready run
+    concurrently in worker processes, so independent branches (e.g. BoW, TF-IDF and
+    embeddings) run in parallel.
+
+    Parameters
+    ----------
+    stages : list[Stage]
+        Stages in topological order (each one after its inputs), e.g. ``build_stages()``
+    artifact_dir : str, optional
+        Directory of the artifacts, by default "data/pipeline"
+    targets : Optional[Iterable[str]], optional
+        Stages to bring up to date, with the stages they depend on, by default None
+        (all of them)
+    n_jobs : int, optional
+        Number of stages run concurrently; 1 runs them in the current process and -1
+        uses all cores, by default 1
+
+    Returns
+    -------
+    dict[str, str]
+        Artifact path (without extension) of each required stage, to be read with
+        ``load_artifact``.
+    """
+    by_name: dict[str, Stage] = {}
+    for stage in stages:
+        missing = [name for name in stage.inputs if name not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown or later stages: {missing}")
+        by_name[stage.name] = stage
+
+    # Stages needed by the targets, in topological order
+    required = set(by_name) if targets is None else set(targets)
+    for stage in reversed(stages):
+        if stage.name in required:
+            required.update(stage.inputs)
+    order = [stage.name for stage in stages if stage.name in required]
+    os.makedirs(artifact_dir, exist_ok=True)
+
+    paths: dict[str, str] = {}
+    hashes: dict[str, str] = {}
+    pending = list(order)
+    n_run = 0
+
+    def stale_ready_stages() -> list[str]:
+        """Fingerprint the stages whose inputs are ready, and return those to run."""
+        to_run = []
+        # In topological order, a stage reused here makes the next ones ready in this pass
+        for name in list(pending):
+            stage = by_name[name]
+            if not all(input_name in hashes for input_name in stage.inputs):
+                continue
+            pending.remove(name)
+            key = _stage_key(stage, [hashes[input_name] for input_name in stage.inputs])
+            paths[name] = os.path.join(artifact_dir, f"{name}-{key}")
+            if os.path.exists(f"{paths[name]}.done"):
+                with open(f"{paths[name]}.done") as f:
+                    hashes[name] = json.load(f)["hash"]
+            else:
+                to_run.append(name)
+        return to_run
+
+    def submit_args(name: str) -> tuple:
+        stage = by_name[name]
+        inputs = [(by_name[input_name].kind, paths[input_name]) for input_name in stage.inputs]
+        return stage, inputs, paths[name]
+
+    if n_jobs == 1:
+        to_run = stale_ready_stages()
+        while to_run:
+            for name in to_run:
+                print(f"Running stage {name}...")
+                seconds, hashes[name] = _run_stage(*submit_args(name))
+                print(f"Stage {name} done in {seconds:.1f}s")
+                n_run += 1
+            to_run = stale_ready_stages()
+    else:
+        with ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs) as executor:
+            running = {}
+            while True:
+                # Submit every stale stage whose inputs are ready
+                for name in stale_ready_stages():
+                    print(f"Running stage {name}...")
+                    running[executor.submit(_run_stage, *submit_args(name))] = name
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    seconds, hashes[name] = future.result()
+                    print(f"Stage {name} done in {seconds:.1f}s")
+                    n_run += 1
+
+    print(f"Pipeline: {n_run} stages run, {len(order) - n_run} up to date")
+    return {name: paths[name] for name in order}
+
+
+def load_artifact(stages: list[Stage], paths: dict[str, str], name: str):
+    """Load the artifact of a stage, from the paths returned by ``run_pipeline``."""
+    kind = next(stage.kind for stage in stages if stage.name == name)
+    return ARTIFACT_FORMATS[kind][1](paths[name])
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Add the Task_3 directory to the Python path
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../Task_3"))
+
+    stages = build_stages("../Task_3/data/Corpus-representacion")
+    paths = run_pipeline(stages, n_jobs=-1)
+
+    results = pd.DataFrame(
+        {
+            stage.name.removeprefix("evaluate_"): load_artifact(stages, paths, stage.name)
+            for stage in stages
+            if stage.name.startswith("evaluate_")
+        }
+    ).T
+    print(results.sort_values("bcubed_fscore", ascending=False).round(3))
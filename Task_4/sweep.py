@@ -0,0 +1,184 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from cluster_evaluation import evaluate_clusterings
+from clustering import kmeans_pipeline
+from scipy import sparse
+from umap import UMAP
+
+
+def fingerprint_vectors(vectors) -> str:
+    """Content hash of a dense or sparse matrix, used as the key of cached reductions."""
+    digest = hashlib.blake2b(digest_size=16)
+    if sparse.issparse(vectors):
+        vectors = sparse.csr_matrix(vectors)
+        digest.update(f"csr{vectors.shape}{vectors.dtype}".encode())
+        for array in (vectors.indptr, vectors.indices, vectors.data):
+            digest.update(np.ascontiguousarray(array).data)
+    else:
+        vectors = np.ascontiguousarray(vectors)
+        digest.update(f"dense{vectors.shape}{vectors.dtype}".encode())
+        digest.update(vectors.data)
+    return digest.hexdigest()
+
+
+def reduce_vectors(
+    vectors,
+    n_components: Optional[int],
+    metric: str = "cosine",
+    random_state: int = 42,
+    cache_dir: str = "data/umap_cache",
+    fingerprint: Optional[str] = None,
+) -> np.ndarray:
+    """UMAP projection of the vectors, computed once and cached on disk.
+
+    The projection is the one ``kmeans_pipeline`` computes before clustering. It is
+    stored as ``.npy`` under ``cache_dir``, keyed by the fingerprint of the input, the
+    number of components, the metric and the seed.
+
+    Parameters
+    ----------
+    vectors : array-like or sparse matrix
+        Vectors to reduce.
+    n_components : Optional[int]
+        Number of UMAP components, or None to return the vectors unchanged.
+    metric : str, optional
+        UMAP metric, by default "cosine"
+    random_state : int, optional
+        UMAP seed, by default 42
+    cache_dir : str, optional
+        Directory of the cached projections, by default "data/umap_cache"
+    fingerprint : Optional[str], optional
+        Precomputed ``fingerprint_vectors(vectors)``, by default None
+
+    Returns
+    -------
+    np.ndarray
+        The (n_samples x n_components) projection.
+    """
+    if not n_components:
+        return vectors
+
+    fingerprint = fingerprint or fingerprint_vectors(vectors)
+    cache_path = os.path.join(
+        cache_dir, f"{fingerprint}_{n_components}_{metric}_{random_state}.npy"
+    )
+    if os.path.exists(cache_path):
+        print(f"UMAP projection found in cache: {cache_path}")
+        return np.load(cache_path)
+
+    print(f"Fitting UMAP with {n_components} components...")
+    umap = UMAP(n_components=n_components, random_state=random_state, metric=metric)
+    reduced = umap.fit_transform(vectors)
+
+    # Write to a temporary file first, so an interrupted run never leaves a partial entry
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, reduced)
+    os.replace(tmp_path, cache_path)
+    return reduced
+
+
+def _fit_labels(reduced, n_clusters: int, minibatch: bool) -> tuple[np.ndarray, float]:
+    """Cluster the reduced vectors with ``kmeans_pipeline`` (the UMAP step is already
+    done), timing the fit."""
+    start = time.perf_counter()
+    labels_pred = kmeans_pipeline(reduced, None, n_clusters=n_clusters, minibatch=minibatch)
+    return labels_pred, time.perf_counter() - start
+
+
+def run_sweep(
+    vectors,
+    labels_true: Sequence,
+    n_components_grid: Iterable[Optional[int]],
+    n_clusters_grid: Iterable[int],
+    metric: str = "cosine",
+    random_state: int = 42,
+    cache_dir: str = "data/umap_cache",
+    n_jobs: int = 1,
+    minibatch: bool = False,
+) -> pd.DataFrame:
+    """Evaluate ``kmeans_pipeline`` over a grid of n_components x n_clusters.
+
+    Each UMAP projection is computed once per ``n_components`` (and reused across runs
+    through the on-disk cache of ``reduce_vectors``); the KMeans fits for all
+    ``n_clusters`` values of a projection are then run in parallel, and all the
+    resulting labelings are scored at once with ``evaluate_clusterings``.
+
+    Parameters
+    ----------
+    vectors : array-like or sparse matrix
+        Vectors to cluster (e.g. TF-IDF or sentence embeddings).
+    labels_true : Sequence
+        Ground truth category of each vector.
+    n_components_grid : Iterable[Optional[int]]
+        Numbers of UMAP components to try; None clusters the vectors directly.
+    n_clusters_grid : Iterable[int]
+        Numbers of clusters to try.
+    metric : str, optional
+        UMAP metric, by default "cosine"
+    random_state : int, optional
+        UMAP seed, by default 42
+    cache_dir : str, optional
+        Directory of the cached projections, by default "data/umap_cache"
+    n_jobs : int, optional
+        Number of worker processes for the KMeans fits; 1 runs them in the current
+        process and -1 uses all cores, by default 1
+    minibatch : bool, optional
+        Cluster with the mini-batch mode of ``kmeans_pipeline``, by default False
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per grid cell with the metrics of ``evaluate_clusterings`` and the
+        KMeans fit time.
+    """
+    labels_true = list(labels_true)
+    n_clusters_grid = list(n_clusters_grid)
+    fingerprint = fingerprint_vectors(vectors)
+
+    grid = []
+    with ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs) as executor:
+        for n_components in n_components_grid:
+            reduced = reduce_vectors(
+                vectors, n_components, metric, random_state, cache_dir, fingerprint
+            )
+            for n_clusters in n_clusters_grid:
+                if n_jobs == 1:
+                    fit = _fit_labels(reduced, n_clusters, minibatch)
+                else:
+                    fit = executor.submit(_fit_labels, reduced, n_clusters, minibatch)
+                grid.append((n_components, n_clusters, fit))
+        fits = [fit if n_jobs == 1 else fit.result() for _, _, fit in grid]  # type: ignore
+
+    # Score every labeling of the grid in one call
+    results = evaluate_clusterings(labels_true, np.stack([labels for labels, _ in fits]))
+    results.insert(0, "n_components", pd.array([cell[0] for cell in grid], dtype="Int64"))
+    results.insert(1, "n_clusters", [cell[1] for cell in grid])
+    results["fit_seconds"] = [seconds for _, seconds in fits]
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Add the Task_3 directory to the Python path
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../Task_3"))
+    from vectorizing import load_vectors_scipy
+
+    gold_corpus = pd.read_csv("../Task_3/data/corpus_raw.csv")
+    tfidf_vectors, _ = load_vectors_scipy("../Task_3/data/VSM/tfidf_vectors")
+
+    results = run_sweep(
+        tfidf_vectors,
+        gold_corpus["category"],
+        n_components_grid=[None, 10, 50],
+        n_clusters_grid=range(4, 11),
+        n_jobs=-1,
+    )
+    print(results.sort_values("bcubed_fscore", ascending=False).to_string(index=False))
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from cluster_evaluation import bcubed_evaluation, evaluate_clusterings
+from sklearn import metrics
+
+
+def test_scores_match_sklearn():
+    rng = np.random.default_rng(0)
+    labels_true = rng.integers(0, 5, 300)
+    stack = np.stack([rng.integers(0, 20, 300), labels_true, np.zeros(300, dtype=np.int64)])
+
+    results = evaluate_clusterings(labels_true, stack)
+
+    for labels_pred, (_, row) in zip(stack, results.iterrows()):
+        homogeneity, completeness, v_measure = metrics.homogeneity_completeness_v_measure(
+            labels_true, labels_pred
+        )
+        expected = {
+            "ari": metrics.adjusted_rand_score(labels_true, labels_pred),
+            "nmi": metrics.normalized_mutual_info_score(labels_true, labels_pred),
+            "ami": metrics.adjusted_mutual_info_score(labels_true, labels_pred),
+            "homogeneity": homogeneity,
+            "completeness": completeness,
+            "v_measure": v_measure,
+        }
+        assert row[list(expected)].to_dict() == pytest.approx(expected, abs=1e-12)
+
+
+def test_bcubed_and_purity_match_definitions():
+    rng = np.random.default_rng(1)
+    labels_true = rng.choice(["a", "b", "c"], 200)
+    stack = np.stack([rng.integers(0, 6, 200), rng.integers(0, 2, 200)])
+
+    results = evaluate_clusterings(labels_true, stack)
+
+    for labels_pred, (_, row) in zip(stack, results.iterrows()):
+        same_cluster = labels_pred[:, None] == labels_pred[None, :]
+        same_class = labels_true[:, None] == labels_true[None, :]
+        correct = (same_cluster & same_class).sum(axis=1)
+        precision = (correct / same_cluster.sum(axis=1)).mean()
+        recall = (correct / same_class.sum(axis=1)).mean()
+        purity = metrics.cluster.contingency_matrix(labels_true, labels_pred).max(axis=0).sum()
+
+        assert row["bcubed_precision"] == pytest.approx(precision, abs=1e-12)
+        assert row["bcubed_recall"] == pytest.approx(recall, abs=1e-12)
+        assert row["purity"] == pytest.approx(purity / 200, abs=1e-12)
+        assert bcubed_evaluation(list(labels_true), list(labels_pred))[:2] == pytest.approx(
+            (precision, recall), abs=1e-12
+        )
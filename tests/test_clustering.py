@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from clustering import SphericalMiniBatchKMeans
+from scipy import sparse
+from sklearn.metrics import adjusted_rand_score
+
+
+@pytest.fixture(scope="module")
+def topics():
+    """Sparse rows drawn from 7 disjoint topic vocabularies, plus shared noise words."""
+    rng = np.random.default_rng(0)
+    n_rows, n_topics, topic_size, n_features = 40000, 7, 2000, 20000
+    labels = rng.integers(0, n_topics, n_rows)
+    columns = np.concatenate(
+        [
+            labels[:, None] * topic_size + rng.integers(0, topic_size, (n_rows, 20)),
+            rng.integers(0, n_features, (n_rows, 20)),
+        ],
+        axis=1,
+    )
+    X = sparse.csr_matrix(
+        (np.ones(columns.size), (np.repeat(np.arange(n_rows), 40), columns.ravel())),
+        shape=(n_rows, n_features),
+    )
+    return X, labels
+
+
+def test_cold_start_recovers_topics(topics):
+    X, labels = topics
+    kmeans = SphericalMiniBatchKMeans(random_state=0).fit(X)
+
+    assert adjusted_rand_score(labels, kmeans.labels_) == pytest.approx(1.0)
+
+
+def test_warm_start_from_converged_centroids_stops(topics):
+    X, _ = topics
+    cold = SphericalMiniBatchKMeans(random_state=0).fit(X)
+    warm = SphericalMiniBatchKMeans(init=cold.cluster_centers_, random_state=1).fit(X)
+
+    assert warm.n_steps_ <= 2
+    np.testing.assert_array_equal(warm.labels_, cold.labels_)
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from pos_metrics import tagging_report
+
+
+GOLD = [[("a", "NN"), ("b", "VB")], [("c", "DT")]]
+
+
+def test_truncated_sentence_counts_missing_tokens_as_errors():
+    with pytest.warns(UserWarning, match="2 gold tokens"):
+        report = tagging_report([[("a", "NN")]], GOLD)
+
+    assert report["accuracy"] == pytest.approx(1 / 3)
+    assert report["n_tokens"] == 3
+    assert report["per_tag"].loc["VB", "support"] == 1
+    assert report["per_tag"].loc["VB", "recall"] == 0
+    np.testing.assert_array_equal(report["mismatch_indices"], [1, 2])
+
+
+def test_extra_output_tokens_are_ignored():
+    output = [[("a", "NN"), ("b", "VB"), ("d", "NN")], [("c", "DT")], [("e", "NN")]]
+    with pytest.warns(UserWarning, match="extra ones are ignored"):
+        report = tagging_report(output, GOLD)
+
+    assert report["accuracy"] == 1.0
+    assert report["n_tokens"] == 3
@@ -0,0 +1,31 @@
+import pytest
+from vectorizing import TextVectorizer, vectorize_text
+
+
+@pytest.mark.parametrize("method", ["hashing", "hashing_tfidf"])
+def test_hashing_empty_corpus(method):
+    X, vocab = vectorize_text([], method=method, n_features=2**10)
+
+    assert X.shape == (0, 2**10)
+    assert X.nnz == 0
+    assert vocab == {}
+
+
+@pytest.mark.parametrize("method", ["hashing", "hashing_tfidf"])
+def test_hashing_rows_are_normalized(method):
+    X, _ = vectorize_text(["the cat sat", "the dog"], method=method, n_features=2**10)
+
+    assert X.shape == (2, 2**10)
+    assert X.multiply(X).sum(axis=1).A1 == pytest.approx([1.0, 1.0])
+
+
+@pytest.mark.parametrize("method", ["bow", "tfidf"])
+def test_loaded_vectorizer_matches_fitted(method, tmp_path):
+    texts = ["the cat sat", "the dog sat", "a bird"]
+    fitted = TextVectorizer(method=method).fit(texts)
+    fitted.save(str(tmp_path / "model"))
+
+    loaded = TextVectorizer.load(str(tmp_path / "model"))
+
+    assert loaded.vocabulary == fitted.vocabulary
+    assert (loaded.transform(texts) != fitted.transform(texts)).nnz == 0
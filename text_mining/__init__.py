@@ -0,0 +1 @@
+"""Helpers shared by the tasks, installed with the project (``uv sync``)."""
@@ -0,0 +1,62 @@
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import numpy as np
+
+
+def write_string_column(directory: str, name: str, values: list[str]) -> None:
+    """Write a string column as one UTF-8 blob plus the (n + 1) byte offsets of its values."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+    np.save(
+        os.path.join(directory, f"{name}.blob.npy"),
+        np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    )
+
+
+def read_string_column(
+    directory: str, name: str, indices: Optional[np.ndarray] = None
+) -> list[str]:
+    """Read a column written by ``write_string_column`` (or some of its values) through a
+    memory map, so that the values that are not requested are not read from disk."""
+    offsets = np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode="r")
+    if indices is None:
+        starts, ends = offsets[:-1], offsets[1:]
+    else:
+        starts, ends = offsets[indices], offsets[indices + 1]
+    if len(starts) == 0:
+        return []
+    if offsets[-1] == 0:
+        # An empty blob cannot be memory-mapped
+        return [""] * len(starts)
+    view = memoryview(np.load(os.path.join(directory, f"{name}.blob.npy"), mmap_mode="r"))
+    return [str(view[start:end], "utf-8") for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+@contextmanager
+def replace_directory(path: str) -> Iterator[str]:
+    """Yield a new directory, written next to ``path``, that replaces it once the block exits.
+
+    The old directory is renamed aside (to ``path.old``) before the swap and deleted
+    after it, so it is never deleted before the new one is in place. If the block
+    raises, the old directory is kept as is.
+    """
+    path = path.rstrip(os.sep)
+    tmp_path, old_path = f"{path}.tmp", f"{path}.old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        yield tmp_path
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
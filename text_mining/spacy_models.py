@@ -0,0 +1,50 @@
+from functools import lru_cache
+from typing import Optional
+
+import spacy
+from spacy.language import Language
+
+
+# Components needed to lemmatize: the rule-based lemmatizer relies on the coarse POS
+# that the attribute ruler maps from the tagger's fine-grained tags.
+LEMMATIZER_COMPONENTS = ("tok2vec", "tagger", "attribute_ruler", "lemmatizer")
+
+# Tokenization only: lexical attributes (is_punct, is_space, lower_...) need no component
+TOKENIZER_COMPONENTS = ()
+
+# Components needed for POS tagging: PTB tags from the tagger, UPOS from the attribute ruler
+TAGGER_COMPONENTS = ("tok2vec", "tagger", "attribute_ruler")
+
+
+@lru_cache(maxsize=4)
+def load_spacy_model(
+    model: str = "en_core_web_sm", components: Optional[tuple[str, ...]] = None
+) -> Language:
+    """Load a spaCy pipeline once per process, keeping only the requested components.
+
+    Pipelines are cached by (model, components) and the least recently used one is
+    evicted when more than four are alive. The returned object is shared between
+    callers, so it must not be modified.
+
+    Parameters
+    ----------
+    model : str, optional
+        Name or path of the spaCy model to load, by default "en_core_web_sm"
+    components : Optional[tuple[str, ...]], optional
+        Names of the pipeline components to keep; every other component is removed.
+        Names missing from the model are ignored. By default None, which keeps the
+        full pipeline.
+
+    Returns
+    -------
+    Language
+        The (pruned) spaCy pipeline.
+    """
+    nlp = spacy.load(model)
+
+    if components is not None:
+        # Drop every component the caller does not need, so it is neither run nor kept in memory
+        for name in [name for name in nlp.component_names if name not in components]:
+            nlp.remove_pipe(name)
+
+    return nlp